@@ -1,12 +1,21 @@
+import os
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy import stats
 from datetime import datetime
 
-def load_and_process_data():
+from wrfcame.store import load_store
+from wrfcame.times import to_local
+
+def load_and_process_data(store_root='series_wrf', tz='America/Mexico_City'):
     """
     Load and process both O3 and SWDOWN data
+    
+    Parameters:
+    store_root (str): Parquet store written by time_series_wrf_zmvm.py;
+        falls back to swdown_hourly_area_timeseries.csv if it does not exist
+    tz (str): Time zone of the RAMA timestamps ('Etc/GMT+6' for fixed UTC-6)
     """
     # Read O3 data
     o3_df = pd.read_csv('RAMA_O3_MAYO_2022_155ppb.csv', 
@@ -15,9 +24,15 @@ def load_and_process_data():
     # Convert O3 timestamps to datetime
     o3_df['timestamp'] = pd.to_datetime(o3_df['timestamp'])
     
-    # Read SWDOWN data
-    swdown_df = pd.read_csv('swdown_hourly_area_timeseries.csv')
-    swdown_df['timestamp'] = pd.to_datetime(swdown_df['timestamp'])
+    # Read SWDOWN data only for the O3 date range; WRF times are UTC and
+    # RAMA observations are local time
+    if os.path.isdir(store_root):
+        swdown_df = load_store(store_root, start=o3_df['timestamp'].min(),
+                               end=o3_df['timestamp'].max(), domain='d02',
+                               region='zmvm', columns=['SWDOWN'], tz=tz)
+    else:
+        swdown_df = pd.read_csv('swdown_hourly_area_timeseries.csv')
+        swdown_df['timestamp'] = to_local(pd.to_datetime(swdown_df['timestamp']), tz)
     
     # Merge datasets on timestamp
     merged_df = pd.merge(o3_df, swdown_df[['timestamp', 'SWDOWN']], 
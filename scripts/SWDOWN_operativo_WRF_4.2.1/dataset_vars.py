@@ -3,7 +3,12 @@
 """
 Read WRF variables
 """
-import netCDF4 as nc
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from wrfcame import scan_header
+
 WRF_file = "/LUSTRE/ID/hidromet/WRF/Salidas_WRF_mayo_2022/wrfout_d02_2022-05-02_00.nc"
-dataset = nc.Dataset(WRF_file, 'r')
-print(dataset.variables.keys())
\ No newline at end of file
+header = scan_header(WRF_file)
+print([var['name'] for var in header['variables']])
@@ -1,6 +1,11 @@
-import xarray as xr
+import os
+import sys
+
 import pandas as pd
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from wrfcame import scan_header
+
 def get_radiation_variables(wrf_file_path):
     """
     Extraer variables relacionadas a Radiacion de Onda Corta (SWDOWN) a partir de 
@@ -18,31 +23,31 @@ def get_radiation_variables(wrf_file_path):
     ]
     
     try:
-        ds = xr.open_dataset(wrf_file_path)
-        
+        # Solo el encabezado NetCDF: no se lee ni se decodifica ninguna variable
+        header = scan_header(wrf_file_path)
+
         rad_vars = []
 
-        for var_name in ds.variables:
-            var = ds[var_name]
-            attrs = var.attrs
-            
+        for var in header['variables']:
+            var_name = var['name']
+            description = var['description']
+
             is_radiation_var = any(keyword in var_name.lower() for keyword in sw_keywords)
-            if 'description' in attrs:
+            if description is not None:
                 is_radiation_var = is_radiation_var or any(
-                    keyword in attrs['description'].lower() for keyword in sw_keywords
+                    keyword in description.lower() for keyword in sw_keywords
                 )
-            
+
             if is_radiation_var:
+                shape = tuple(header['n_times'] if n is None else n for n in var['shape'])
                 rad_vars.append({
                     'Variable': var_name,
-                    'Dimensions': ', '.join(var.dims),
-                    'Units': attrs.get('units', 'No units specified'),
-                    'Description': attrs.get('description', 'No description available'),
-                    'Shape': str(var.shape)
+                    'Dimensions': ', '.join(var['dims']),
+                    'Units': var['units'] if var['units'] is not None else 'No units specified',
+                    'Description': description if description is not None else 'No description available',
+                    'Shape': str(shape)
                 })
-        
-        ds.close()
-        
+
         df = pd.DataFrame(rad_vars)
         if not df.empty:
             df = df.sort_values('Variable').reset_index(drop=True)
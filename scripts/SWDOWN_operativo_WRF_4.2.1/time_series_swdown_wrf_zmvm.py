@@ -1,11 +1,11 @@
-import xarray as xr
-import pandas as pd
-import numpy as np
-import glob
+import json
 import os
-from datetime import datetime
+import sys
 
-def extract_swdown_timeseries(wrf_dir, lon_bounds=[-99.26, -98.88], lat_bounds=[19.3, 19.75]):
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from wrfcame import BBox, add_time_columns, aggregate, extract_timeseries
+
+def extract_swdown_timeseries(wrf_dir, lon_bounds=[-99.26, -98.88], lat_bounds=[19.3, 19.75], months=(3,), workers=1):
     """
     Extrae la serie de tiempo de SWDOWN de los archivos de salida diarios de WRF para una área específica (Dominio CAME).
     
@@ -13,84 +13,30 @@ def extract_swdown_timeseries(wrf_dir, lon_bounds=[-99.26, -98.88], lat_bounds=[
     wrf_dir (str): Directorio con las salidas del modelo WRF
     lon_bounds (list): [min_lon, max_lon] area de interes
     lat_bounds (list): [min_lat, max_lat] area de interes
+    months (tuple): Meses a considerar (3 = marzo, 4 = abril, 5 = mayo)
+    workers (int): Numero de procesos para leer los archivos en paralelo
     
     Regresa:
     tuple: (DataFrame with hourly data, DataFrame with daily maximum values)
     """
-    wrf_files = sorted(glob.glob(os.path.join(wrf_dir, "wrfout_d02_*.nc")))
-    print(f"Existen {len(wrf_files)} archivos de salidas de WRF ")
-    
-    all_data = []
-    
-    for file in wrf_files:
-        try:
-            print(f"Procesando archivo: {os.path.basename(file)}")
-            ds = xr.open_dataset(file)
-            
-            # lat/lon coord
-            if 'XLAT' in ds and 'XLONG' in ds:
-                lats = ds.XLAT.values[0]  # Obtener coord
-                lons = ds.XLONG.values[0]
-                
-                # mascara del area de interes
-                lat_mask = (lats >= lat_bounds[0]) & (lats <= lat_bounds[1])
-                lon_mask = (lons >= lon_bounds[0]) & (lons <= lon_bounds[1])
-                combined_mask = lat_mask & lon_mask
-                
-                # Calcula el promedio de SWDOWN en la mascara
-                swdown = ds.SWDOWN.where(combined_mask).mean(dim=['south_north', 'west_east'])
-            else:
-                print(f"Warning: XLAT/XLONG not found in {file}, skipping spatial subsetting")
-                continue
-            
-            # Extrae las horas desde el nombre del archivo
-            file_time_str = os.path.basename(file).split('_')[2:4]
-            file_time_str = '_'.join(file_time_str).replace('.nc', '')
-            start_time = datetime.strptime(file_time_str, '%Y-%m-%d_%H')
-            
-            # Crea un rango de tiempos basado en la longitud de swdown
-            n_times = len(swdown)
-            times = pd.date_range(start=start_time, periods=n_times, freq='h')
-            
-            # Crea DataFrame
-            df = pd.DataFrame({
-                'timestamp': times,
-                'SWDOWN': swdown.values,
-                'lat_min': lat_bounds[0],
-                'lat_max': lat_bounds[1],
-                'lon_min': lon_bounds[0],
-                'lon_max': lon_bounds[1]
-            })
-            
-            all_data.append(df)
-            ds.close()
-            
-        except Exception as e:
-            print(f"Error file {file}: {str(e)}")
-            continue
-    
-    if not all_data:
+    # Calcula el promedio de SWDOWN en el area de interes
+    selector = BBox(lat_bounds, lon_bounds)
+    final_df = extract_timeseries(wrf_dir, domain='d02', variables=['SWDOWN'],
+                                  selector=selector, workers=workers)
+    if final_df is None:
         return None, None
-        
-    # Combinar todos los datos
-    final_df = pd.concat(all_data, ignore_index=True)
-    final_df = final_df.sort_values('timestamp')
+    
+    # Limites del area de interes (una vez, como metadatos de la tabla)
+    final_df.attrs.update(selector.describe())
     
     # Agregar informacion de tiempo
-    final_df['date'] = final_df['timestamp'].dt.date
-    final_df['hour'] = final_df['timestamp'].dt.hour
-    final_df['day'] = final_df['timestamp'].dt.day
-    final_df['month'] = final_df['timestamp'].dt.month
+    add_time_columns(final_df)
     
-    # Considerar solo el mes de marzo
-    final_df = final_df[final_df['month'] == 3]
-    # final_df = final_df[final_df['month'] == 4]
-    # final_df = final_df[final_df['month'] == 5]
+    # Considerar solo los meses de estudio
+    final_df = final_df[final_df['month'].isin(months)]
     
     # Calcular el valor maximo diario
-    daily_max = final_df.groupby('date').agg({
-        'SWDOWN': 'max'
-    }).round(2)
+    daily_max = aggregate(final_df, ['SWDOWN'], products=['daily'], stats=['max'])['daily']
     daily_max.columns = ['max_SWDOWN']
     
     return final_df, daily_max
@@ -157,6 +103,8 @@ if __name__ == "__main__":
         df.to_csv(f"{output_prefix}_horarios.csv", index=False)
         #df_horarios.to_csv(f"{output_prefix}_horarios.csv", index=False)
         daily_max.to_csv(f"{output_prefix}_diarios_max.csv")
+        with open(f"{output_prefix}_area.json", 'w') as f:
+            json.dump(df.attrs, f, indent=1)
         
         # Crea graficas
         print("Crea las graficas...")
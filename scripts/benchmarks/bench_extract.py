@@ -0,0 +1,245 @@
+"""
+Pruebas de rendimiento de la extraccion de series (wrfcame.engine).
+
+Genera un conjunto de wrfout_d02 sinteticos (ver synthetic.py), mide cada
+modo de extraccion en un proceso nuevo y guarda los resultados en JSON con
+el commit actual, para comparar entre commits:
+
+    cd scripts
+    python benchmarks/bench_extract.py                      # -> benchmarks/results/<commit>.json
+    python benchmarks/bench_extract.py --compare benchmarks/results/<base>.json
+
+Por modo se reporta el tiempo total, el tiempo por etapa medido en la
+misma extraccion con la instrumentacion de wrfcame (open, grid, read,
+reduce, times, frame, close por archivo, sumadas sobre todos los archivos
+y procesos, y concat; ver instrument.py), la memoria residente maxima
+(RSS) del proceso y de los procesos de lectura, y los MB/s leidos de las
+variables pedidas. El backend dask solo reporta el tiempo total.
+
+Los resultados van a benchmarks/results/ (ignorado por git) o a -o.
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+sys.path.insert(0, HERE)
+
+import pandas as pd
+
+from synthetic import FILL_2D, FILL_3D, make_archive, variable_count
+from wrfcame import DomainMean, Point, find_wrf_files, iter_files, open_wrf, region
+from wrfcame.diagnostics import inputs
+from wrfcame.engine import finalize_timeseries
+from wrfcame.grid_index import default_grid_index
+from wrfcame.instrument import Instrumentation
+
+METEO_VARIABLES = ('SWDOWN', 'T2', 'Q2', 'U10', 'V10', 'WSPD10', 'PBLH', 'CLDFRA_TOT')
+
+# Modos a medir: selector, variables, procesos y backend
+CASES = {
+    'serial_bbox': dict(selector=lambda: region('came'), variables=('SWDOWN',), workers=1),
+    'parallel_bbox': dict(selector=lambda: region('came'), variables=('SWDOWN',),
+                          workers=max(2, os.cpu_count() or 1)),
+    'point': dict(selector=lambda: Point(19.4326, -99.1332), variables=('SWDOWN',), workers=1),
+    'domain_mean': dict(selector=DomainMean, variables=('SWDOWN',), workers=1),
+    'multivar': dict(selector=lambda: region('came'), variables=METEO_VARIABLES, workers=1),
+    'dask_bbox': dict(selector=lambda: region('came'), variables=('SWDOWN',), workers=1,
+                      backend='dask'),
+}
+
+
+def hyperslab_bytes(path, variables, selector):
+    """Bytes que se leen del archivo para las variables en la ventana del selector."""
+    ds = open_wrf(path)
+    try:
+        footprint = default_grid_index().footprint(ds, selector)
+        window = {
+            'south_north': len(range(*footprint.y.indices(len(ds.dimensions['south_north'])))),
+            'west_east': len(range(*footprint.x.indices(len(ds.dimensions['west_east'])))),
+        }
+        total = 0
+        for var in dict.fromkeys(v for name in variables for v in inputs(name)):
+            variable = ds.variables[var]
+            cells = variable.dtype.itemsize
+            for dim in variable.dimensions:
+                cells *= window.get(dim, len(ds.dimensions[dim]))
+            total += cells
+        return total
+    finally:
+        ds.close()
+
+
+def peak_rss_mb():
+    """
+    Memoria residente maxima de este proceso en MB.
+
+    Se lee VmHWM de /proc porque en Linux ru_maxrss se conserva al hacer
+    exec y reportaria la RSS del proceso padre.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_case(name, archive, queue):
+    """Mide un modo en este proceso y manda el resultado por `queue`."""
+    case = CASES[name]
+    selector = case['selector']()
+    files = find_wrf_files(archive, 'd02')
+    stages = {}
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        if case.get('backend') == 'dask':
+            from wrfcame.lazy import extract_timeseries_lazy
+            df = extract_timeseries_lazy(archive, 'd02', case['variables'], selector)
+        else:
+            # Las etapas salen de la propia extraccion (cada archivo se abre una vez)
+            instrumentation = Instrumentation()
+            frames = [df for _, df in iter_files(files, case['variables'], selector,
+                                                 case['workers'], instrumentation)]
+            with instrumentation.stage('concat'):
+                df = finalize_timeseries(pd.concat(frames, ignore_index=True))
+            stages = instrumentation.summary()['total_s'].to_dict()
+        wall = time.perf_counter() - start
+
+    read = sum(hyperslab_bytes(f, case['variables'], selector) for f in files)
+    queue.put({
+        'wall_s': wall,
+        'stages_s': stages,
+        'rows': len(df),
+        'peak_rss_mb': peak_rss_mb(),
+        # ru_maxrss esta en kB en Linux
+        'workers_peak_rss_mb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+        'mb_read': read / 2 ** 20,
+    })
+
+
+def measure(name, archive, repeat):
+    """
+    Corre un modo `repeat` veces, cada una en un proceso nuevo (para que
+    la RSS maxima sea la del modo), y resume con la mediana.
+    """
+    context = multiprocessing.get_context('spawn')
+    runs = []
+    for _ in range(repeat):
+        queue = context.Queue()
+        process = context.Process(target=run_case, args=(name, archive, queue))
+        process.start()
+        runs.append(queue.get())
+        process.join()
+
+    result = dict(runs[0])
+    result['wall_s'] = statistics.median(r['wall_s'] for r in runs)
+    result['runs_s'] = [r['wall_s'] for r in runs]
+    result['stages_s'] = {
+        stage: statistics.median(r['stages_s'].get(stage, 0.0) for r in runs)
+        for stage in runs[0]['stages_s']
+    }
+    result['peak_rss_mb'] = max(r['peak_rss_mb'] for r in runs)
+    result['workers_peak_rss_mb'] = max(r['workers_peak_rss_mb'] for r in runs)
+    result['mb_per_s'] = result['mb_read'] / result['wall_s']
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(results, base_path, threshold=0.10):
+    """Imprime el cambio de tiempo contra otro JSON y marca las regresiones."""
+    with open(base_path) as f:
+        base = json.load(f)
+    print(f"\nComparacion contra {base['commit']} ({base_path}):")
+    for name, result in results['cases'].items():
+        old = base['cases'].get(name)
+        if old is None:
+            continue
+        change = result['wall_s'] / old['wall_s'] - 1
+        flag = '  <-- mas lento' if change > threshold else ''
+        print(f"  {name:15s} {old['wall_s']:8.3f} s -> {result['wall_s']:8.3f} s "
+              f"({change:+.1%}){flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'wrfcame_bench'),
+                        help='Directorio para los wrfout sinteticos (se reutilizan)')
+    parser.add_argument('--files', type=int, default=2, help='Pronosticos diarios (archivos)')
+    parser.add_argument('--frames', type=int, default=120, help='Tiempos horarios por archivo')
+    parser.add_argument('--vars2d', type=int, default=FILL_2D,
+                        help=f"Variables 2D de relleno (default: {FILL_2D})")
+    parser.add_argument('--vars3d', type=int, default=FILL_3D,
+                        help=f"Variables 3D de relleno (default: {FILL_3D}; "
+                             f"{variable_count()} variables por archivo)")
+    parser.add_argument('--levels', type=int, default=10, help='Niveles verticales')
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), default=list(CASES))
+    parser.add_argument('--repeat', type=int, default=3, help='Corridas por modo (se usa la mediana)')
+    parser.add_argument('-o', '--output',
+                        help='JSON de salida (default: benchmarks/results/<commit>.json, ignorado por git)')
+    parser.add_argument('--compare', help='JSON de una corrida anterior')
+    args = parser.parse_args(argv)
+
+    params = {k: getattr(args, k) for k in ('files', 'frames', 'vars2d', 'vars3d', 'levels')}
+    archive = os.path.join(
+        args.workdir, 'f{frames}_v{vars2d}x{vars3d}_l{levels}'.format(**params))
+    print(f"Generando/reutilizando {args.files} wrfout sinteticos en {archive}")
+    make_archive(archive, files=args.files, frames=args.frames, vars2d=args.vars2d,
+                 vars3d=args.vars3d, levels=args.levels)
+    # Indice de malla propio: la malla sintetica tiene la geometria de d02
+    # pero no sus coordenadas reales
+    os.environ['WRFCAME_CACHE'] = os.path.join(args.workdir, 'cache')
+
+    commit = git_commit()
+    results = {
+        'commit': commit,
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'params': params,
+        # Variables por archivo (las de relleno se declaran sin escribirse)
+        'n_variables': variable_count(args.vars2d, args.vars3d),
+        'archive_mb': sum(os.path.getsize(f) for f in find_wrf_files(archive, 'd02')) / 2 ** 20,
+        'cases': {},
+    }
+    for name in args.cases:
+        result = measure(name, archive, args.repeat)
+        results['cases'][name] = result
+        print(f"  {name:15s} {result['wall_s']:8.3f} s  {result['peak_rss_mb']:8.1f} MB RSS  "
+              f"{result['mb_per_s']:8.1f} MB/s")
+
+    output = args.output or os.path.join(HERE, 'results', f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=1)
+    print(f"Resultados en {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Comprueba el cache de campos (wrfcame.field_cache) con varios procesos.
+
+Con un presupuesto menor que los campos de todos los archivos y sin
+periodo de gracia, cada proceso borra entradas que otros acaban de
+escribir o van a abrir. La extraccion con el cache debe dar exactamente lo
+mismo que sin el, en cada corrida y sin omitir archivos:
+
+    cd scripts
+    python benchmarks/check_field_cache.py
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+sys.path.insert(0, HERE)
+
+import pandas as pd
+
+from synthetic import make_archive
+from wrfcame import FieldCache, extract_timeseries, region
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'wrfcame_check'),
+                        help='Directorio para los wrfout sinteticos (se reutilizan)')
+    parser.add_argument('--files', type=int, default=6, help='Pronosticos diarios (archivos)')
+    parser.add_argument('--workers', type=int, default=3, help='Procesos de lectura')
+    parser.add_argument('--budget', type=float, default=10, help='Presupuesto del cache en MB')
+    parser.add_argument('--runs', type=int, default=3, help='Corridas con el cache')
+    args = parser.parse_args(argv)
+
+    archive = os.path.join(args.workdir, 'archive')
+    make_archive(archive, files=args.files, frames=24, vars2d=0, vars3d=0, levels=2)
+    os.environ['WRFCAME_CACHE'] = os.path.join(args.workdir, 'cache')
+    variables = ['SWDOWN', 'T2', 'WSPD10']
+
+    expected = extract_timeseries(archive, variables=variables, selector=region('came'),
+                                  overlap='all')
+    cache = FieldCache(os.path.join(args.workdir, 'fields'), budget_mb=args.budget, grace_s=0)
+    for name in cache.entries()['key']:
+        cache.remove(name)
+    for run in range(args.runs):
+        df = extract_timeseries(archive, variables=variables, selector=region('came'),
+                                overlap='all', workers=args.workers, field_cache=cache)
+        if df is None:
+            sys.exit(f"Corrida {run}: no se proceso ningun archivo")
+        pd.testing.assert_frame_equal(df, expected)
+        used = cache.entries()['nbytes'].sum() / 2 ** 20
+        print(f"Corrida {run}: {len(df)} filas iguales, cache {used:.1f} MB")
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Comprueba que los metadatos de la region llegan al almacen Parquet.
+
+Hace dos corridas de extract_incremental (la segunda con un pronostico
+nuevo) en un almacen vacio y revisa que _regions.json tenga los limites
+del area (selector.describe()), que region_table y load_store(...).attrs
+los regresen y que la serie tenga todos los ciclos:
+
+    cd scripts
+    python benchmarks/check_store_regions.py
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+sys.path.insert(0, HERE)
+
+from synthetic import make_archive
+from wrfcame import region
+from wrfcame.manifest import extract_incremental
+from wrfcame.store import load_forecasts, load_store, region_table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'wrfcame_check'),
+                        help='Directorio para los wrfout sinteticos (se reutilizan)')
+    args = parser.parse_args(argv)
+
+    archive = os.path.join(args.workdir, 'regions_archive')
+    paths = make_archive(archive, files=2, frames=24, vars2d=0, vars3d=0, levels=2)
+    os.environ['WRFCAME_CACHE'] = os.path.join(args.workdir, 'cache')
+    store = os.path.join(args.workdir, 'regions_store')
+    shutil.rmtree(store, ignore_errors=True)
+    selector = region('came')
+    expected = selector.describe()
+
+    # Primera corrida con un pronostico; la segunda solo procesa el nuevo
+    hidden = paths[-1] + '.hidden'
+    os.replace(paths[-1], hidden)
+    try:
+        processed = [extract_incremental(archive, store, 'came', selector)]
+    finally:
+        os.replace(hidden, paths[-1])
+    processed.append(extract_incremental(archive, store, 'came', selector))
+    if processed != [1, 1]:
+        sys.exit(f"Archivos procesados por corrida: {processed}, se esperaba [1, 1]")
+
+    table = region_table(store)
+    if table.empty or table.loc[('d02', 'came')].to_dict() != expected:
+        sys.exit(f"region_table no tiene los limites del area:\n{table}")
+    df = load_store(store)
+    if df.attrs.get('regions') != {'d02/came': expected}:
+        sys.exit(f"load_store(...).attrs['regions'] = {df.attrs.get('regions')}")
+    cycles = load_forecasts(store).index.get_level_values('init_time').nunique()
+    if cycles != len(paths):
+        sys.exit(f"El almacen tiene {cycles} ciclos, se esperaban {len(paths)}")
+    print(f"Region d02/came: {expected}")
+    print(f"{len(df)} filas, {cycles} ciclos")
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Archivos wrfout_d02 sinteticos para las pruebas de rendimiento.
+
+Tienen la malla del dominio operativo d02 (e_we=274, e_sn=157, es decir
+156 x 273 puntos de masa), salida horaria, los atributos globales de
+geometria de geo_em.d02.nc y las variables que usan los scripts (Times,
+XLAT, XLONG, XTIME, SWDOWN, T2, Q2, U10, V10, PBLH, CLDFRA) mas variables
+de relleno 2D y 3D. Con los valores por omision (vars2d=120, vars3d=40)
+cada archivo tiene 171 variables, como un wrfout real, asi que abrir el
+archivo y leer su encabezado cuesta lo mismo. Las variables de relleno se
+declaran (dimensiones, atributos, fragmentos) pero no se escriben: HDF5 no
+reserva sus bloques y el archivo ocupa solo lo de las variables que usan
+los scripts. Los valores son aleatorios; solo importan la forma y el
+tamanio.
+"""
+import os
+from datetime import datetime, timedelta
+
+import netCDF4 as nc
+import numpy as np
+
+# Atributos globales del dominio operativo d02 (geo_em.d02.nc)
+D02_ATTRS = {
+    'MAP_PROJ': 3,
+    'WEST-EAST_GRID_DIMENSION': 274,
+    'SOUTH-NORTH_GRID_DIMENSION': 157,
+    'DX': 5000.0,
+    'DY': 5000.0,
+    'CEN_LAT': 18.134193,
+    'CEN_LON': -99.62255,
+    'TRUELAT1': 20.318,
+    'TRUELAT2': 0.0,
+    'MOAD_CEN_LAT': 22.317993,
+    'STAND_LON': -99.119,
+}
+
+# Extension de XLAT_M / XLONG_M en geo_em.d02.nc
+D02_LAT = (14.568527, 21.628654)
+D02_LON = (-106.14471, -93.100395)
+
+SURFACE_VARIABLES = ('SWDOWN', 'T2', 'Q2', 'U10', 'V10', 'PBLH')
+
+# Times, XTIME, XLAT, XLONG, SURFACE_VARIABLES y CLDFRA
+BASE_VARIABLES = 4 + len(SURFACE_VARIABLES) + 1
+
+# Variables de relleno por omision: 171 variables por archivo
+FILL_2D = 120
+FILL_3D = 40
+
+
+def variable_count(vars2d=FILL_2D, vars3d=FILL_3D):
+    """Numero de variables de un wrfout sintetico."""
+    return BASE_VARIABLES + vars2d + vars3d
+
+
+def make_wrfout(path, init_time, frames=120, vars2d=FILL_2D, vars3d=FILL_3D, levels=10, seed=0):
+    """
+    Escribe un wrfout_d02 sintetico.
+
+    Parametros:
+    path (str): Ruta del archivo a crear
+    init_time (datetime): Inicio del pronostico
+    frames (int): Numero de tiempos horarios
+    vars2d (int): Variables 2D de relleno (ademas de SURFACE_VARIABLES;
+        se declaran sin escribirse)
+    vars3d (int): Variables 3D de relleno (ademas de CLDFRA; se declaran
+        sin escribirse)
+    levels (int): Niveles verticales (bottom_top)
+    seed (int): Semilla de los valores aleatorios
+    """
+    ny = D02_ATTRS['SOUTH-NORTH_GRID_DIMENSION'] - 1
+    nx = D02_ATTRS['WEST-EAST_GRID_DIMENSION'] - 1
+    rng = np.random.default_rng(seed)
+    times = [init_time + timedelta(hours=h) for h in range(frames)]
+
+    ds = nc.Dataset(path, 'w')
+    try:
+        ds.createDimension('Time', None)
+        ds.createDimension('DateStrLen', 19)
+        ds.createDimension('south_north', ny)
+        ds.createDimension('west_east', nx)
+        ds.createDimension('bottom_top', levels)
+        for name, value in D02_ATTRS.items():
+            ds.setncattr(name, value)
+        ds.setncattr('SIMULATION_START_DATE', init_time.strftime('%Y-%m-%d_%H:%M:%S'))
+
+        chars = np.array([list(t.strftime('%Y-%m-%d_%H:%M:%S').encode()) for t in times],
+                         dtype='u1')
+        ds.createVariable('Times', 'S1', ('Time', 'DateStrLen'))[:] = chars.view('S1')
+
+        xtime = ds.createVariable('XTIME', 'f4', ('Time',))
+        xtime.units = f"minutes since {init_time:%Y-%m-%d %H:%M:%S}"
+        xtime[:] = np.arange(frames) * 60.0
+
+        lats = np.linspace(*D02_LAT, ny, dtype='f4')[:, None].repeat(nx, axis=1)
+        lons = np.linspace(*D02_LON, nx, dtype='f4')[None, :].repeat(ny, axis=0)
+        for name, grid in (('XLAT', lats), ('XLONG', lons)):
+            var = ds.createVariable(name, 'f4', ('Time', 'south_north', 'west_east'))
+            var[:] = np.broadcast_to(grid, (frames, ny, nx))
+
+        for name in SURFACE_VARIABLES:
+            var = ds.createVariable(name, 'f4', ('Time', 'south_north', 'west_east'))
+            var[:] = rng.random((frames, ny, nx), dtype='f4')
+
+        var = ds.createVariable('CLDFRA', 'f4', ('Time', 'bottom_top', 'south_north', 'west_east'))
+        # Por tiempo para no tener todo el campo 3D en memoria
+        for t in range(frames):
+            var[t] = rng.random((levels, ny, nx), dtype='f4')
+
+        fill = ([(f"FILL2D_{i:03d}", ('Time', 'south_north', 'west_east')) for i in range(vars2d)]
+                + [(f"FILL3D_{i:03d}", ('Time', 'bottom_top', 'south_north', 'west_east'))
+                   for i in range(vars3d)])
+        for name, dims in fill:
+            var = ds.createVariable(name, 'f4', dims)
+            var.setncatts({'FieldType': 104, 'MemoryOrder': 'XY ' if len(dims) == 3 else 'XYZ',
+                           'description': f"relleno {name}", 'units': '-', 'stagger': ''})
+    finally:
+        ds.close()
+
+
+def make_archive(directory, files=2, start=datetime(2022, 5, 1), **kwargs):
+    """
+    Crea `files` pronosticos diarios wrfout_d02_<fecha>_00.nc en `directory`.
+
+    Los archivos que ya existen no se vuelven a escribir.
+
+    Regresa:
+    list: Rutas de los archivos
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(files):
+        init_time = start + timedelta(days=i)
+        path = os.path.join(directory, f"wrfout_d02_{init_time:%Y-%m-%d_%H}.nc")
+        if not os.path.exists(path):
+            make_wrfout(path, init_time, seed=i, **kwargs)
+        paths.append(path)
+    return paths
@@ -12,10 +12,27 @@
 #SBATCH --mail-type=BEGIN
 #SBATCH --mail-type=END
 
+# Directorio de scripts/ (desde donde se hace sbatch) para el post-proceso
+SCRIPT_DIR="${SLURM_SUBMIT_DIR:-$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)}"
+# Almacenes de campos de superficie fragmentados para series de tiempo
+SERIES_DIR="${SERIES_DIR:-/LUSTRE/ID/hidromet/WRF/Series_WRF}"
+
 cd /LUSTRE/ID/hidromet/WRF/Dominio3/WRFV4/WRF
 ml load intel/2022u2/compilers
 ml load curl hdf5 jasper libaec libpng mpi netcdf-c netcdf-fortran zlib
 ml load wrf/4.2.1
 
 export CORES=156
-/sbin/logsave REGISTRO_WRF_n_156_4_operativo2_dCorona_operativo mpirun -np $CORES wrf.exe
+/sbin/logsave REGISTRO_WRF_n_156_4_operativo2_dCorona_operativo mpirun -np $CORES wrf.exe || exit 1
+
+# Post-proceso: agrega los campos de superficie del pronostico recien
+# terminado (el wrfout mas nuevo de cada dominio) al almacen del dominio,
+# fragmentado para leer series de tiempo (ver scripts/wrfcame/rechunk.py).
+# Los dominios salen de los wrfout presentes (max_dom = 3: d01, d02 y d03)
+mkdir -p "${SERIES_DIR}"
+DOMAINS=$(ls wrfout_d[0-9][0-9]_* 2>/dev/null | sed -n 's/^wrfout_\(d[0-9][0-9]\)_.*/\1/p' | sort -u)
+for DOMAIN in ${DOMAINS}; do
+    LATEST=$(ls -t wrfout_${DOMAIN}_* | head -n 1)
+    PYTHONPATH="${SCRIPT_DIR}${PYTHONPATH:+:${PYTHONPATH}}" \
+        python -m wrfcame rechunk "${LATEST}" -o "${SERIES_DIR}/series_${DOMAIN}.zarr"
+done
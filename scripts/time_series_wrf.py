@@ -1,11 +1,6 @@
-import xarray as xr
-import pandas as pd
-import numpy as np
-import glob
-import os
-from datetime import datetime
+from wrfcame import DomainMean, Point, add_time_columns, daily_statistics, extract_timeseries
 
-def extract_swdown_timeseries(wrf_dir, point_lat=None, point_lon=None):
+def extract_swdown_timeseries(wrf_dir, point_lat=None, point_lon=None, workers=1):
     """
     Extract SWDOWN time series from daily WRF output files for a month.
     
@@ -13,79 +8,29 @@ def extract_swdown_timeseries(wrf_dir, point_lat=None, point_lon=None):
     wrf_dir (str): Directory containing WRF output files
     point_lat (float, optional): Latitude of point of interest
     point_lon (float, optional): Longitude of point of interest
+    workers (int): Number of processes reading files in parallel
     
     Returns:
     pandas.DataFrame: DataFrame containing SWDOWN time series
     """
-    # Get list of WRF output files
-    wrf_files = sorted(glob.glob(os.path.join(wrf_dir, "wrfout_d01_*.nc")))
-    print(f"Found {len(wrf_files)} WRF output files")
+    if point_lat is not None and point_lon is not None:
+        # For a specific point - nearest grid point
+        selector = Point(point_lat, point_lon)
+    else:
+        # Domain average if no specific point is given
+        selector = DomainMean()
     
-    all_data = []
+    final_df = extract_timeseries(wrf_dir, domain='d01', variables=['SWDOWN'], selector=selector, workers=workers)
+    if final_df is None:
+        return None, None
     
-    for file in wrf_files:
-        try:
-            print(f"Processing file: {os.path.basename(file)}")
-            # Open dataset
-            ds = xr.open_dataset(file)
-            
-            if point_lat is not None and point_lon is not None:
-                # For a specific point - find nearest grid point
-                lat = ds.XLAT.isel(Time=0)
-                lon = ds.XLONG.isel(Time=0)
-                
-                # Find indices of nearest grid point
-                dist = abs(lat - point_lat) + abs(lon - point_lon)
-                y_idx, x_idx = np.unravel_index(dist.argmin(), dist.shape)
-                
-                # Extract SWDOWN for this point
-                swdown = ds.SWDOWN.isel(south_north=y_idx, west_east=x_idx)
-                
-            else:
-                # Calculate domain average if no specific point is given
-                swdown = ds.SWDOWN.mean(dim=['south_north', 'west_east'])
-            
-            # Extract times from filename if Times variable is not accessible
-            file_time_str = os.path.basename(file).split('_')[2:4]
-            file_time_str = '_'.join(file_time_str).replace('.nc', '')
-            start_time = datetime.strptime(file_time_str, '%Y-%m-%d_%H')
-            
-            # Create time range based on SWDOWN shape
-            n_times = len(swdown)
-            times = pd.date_range(start=start_time, periods=n_times, freq='H')
-            
-            # Create DataFrame for this file
-            df = pd.DataFrame({
-                'timestamp': times,
-                'SWDOWN': swdown.values
-            })
-            
-            all_data.append(df)
-            ds.close()
-            
-        except Exception as e:
-            print(f"Error processing file {file}: {str(e)}")
-            print("Full error details:", e)
-            continue
+    # Add additional time information
+    add_time_columns(final_df)
     
-    # Combine all data
-    if all_data:
-        final_df = pd.concat(all_data, ignore_index=True)
-        final_df = final_df.sort_values('timestamp')
-        
-        # Add additional time information
-        final_df['date'] = final_df['timestamp'].dt.date
-        final_df['hour'] = final_df['timestamp'].dt.hour
-        final_df['day'] = final_df['timestamp'].dt.day
-        
-        # Calculate daily statistics
-        daily_stats = final_df.groupby('date').agg({
-            'SWDOWN': ['mean', 'max', 'min', 'std']
-        }).round(2)
-        
-        return final_df, daily_stats
+    # Calculate daily statistics
+    daily_stats = daily_statistics(final_df, 'SWDOWN')
     
-    return None, None
+    return final_df, daily_stats
 
 def plot_swdown_timeseries(df, daily_stats):
     """
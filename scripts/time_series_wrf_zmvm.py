@@ -1,11 +1,13 @@
-import xarray as xr
-import pandas as pd
-import numpy as np
-import glob
 import os
-from datetime import datetime
 
-def extract_swdown_area(wrf_dir, lat_bounds, lon_bounds):
+from wrfcame import BBox, Regions, add_time_columns, daily_statistics, extract_timeseries
+from wrfcame.engine import finalize_timeseries
+from wrfcame.store import append_to_store
+
+# Meteorological drivers for the ozone analysis (read in the same pass as SWDOWN)
+METEO_VARIABLES = ['SWDOWN', 'T2', 'Q2', 'U10', 'V10', 'WSPD10', 'PBLH', 'CLDFRA_TOT']
+
+def extract_swdown_area(wrf_dir, lat_bounds, lon_bounds, variables=('SWDOWN',), workers=1):
     """
     Extract SWDOWN time series from daily WRF output files 
     
@@ -13,75 +15,54 @@ def extract_swdown_area(wrf_dir, lat_bounds, lon_bounds):
     wrf_dir (str): Directory containing WRF output files
     lat_bounds (tuple): (min_lat, max_lat) in decimal degrees
     lon_bounds (tuple): (min_lon, max_lon) in decimal degrees
+    variables (list): WRF variables and diagnostics to extract (must include SWDOWN)
+    workers (int): Number of processes reading files in parallel
     
     Returns:
-    tuple: (DataFrame with hourly data, DataFrame with daily statistics)
+    tuple: (DataFrame with hourly data, DataFrame with daily statistics,
+    DataFrame with every forecast cycle: init_time and lead_hour per row)
     """
-    wrf_files = sorted(glob.glob(os.path.join(wrf_dir, "wrfout_d02_*.nc")))
-    print(f"Found {len(wrf_files)} WRF output files")
+    # Average every variable over the grid cells inside the area, keeping
+    # every forecast cycle (init_time, lead_hour) for the store
+    forecasts = extract_timeseries(wrf_dir, domain='d02', variables=list(variables),
+                                   selector=BBox(lat_bounds, lon_bounds), workers=workers,
+                                   overlap='all')
+    if forecasts is None:
+        return None, None, None
     
-    all_data = []
-    
-    for file in wrf_files:
-        try:
-            print(f"Processing file: {os.path.basename(file)}")
-            ds = xr.open_dataset(file)
-            
-            # Get the grid coordinates
-            lat = ds.XLAT.isel(Time=0)
-            lon = ds.XLONG.isel(Time=0)
-            
-            # Create mask for the area of interest
-            mask = (
-                (lat >= lat_bounds[0]) & 
-                (lat <= lat_bounds[1]) & 
-                (lon >= lon_bounds[0]) & 
-                (lon <= lon_bounds[1])
-            )
-            
-            # Calculate average SWDOWN for the masked area
-            swdown = ds.SWDOWN.where(mask).mean(dim=['south_north', 'west_east'])
-            
-            # Extract times from filename
-            file_time_str = os.path.basename(file).split('_')[2:4]
-            file_time_str = '_'.join(file_time_str).replace('.nc', '')
-            start_time = datetime.strptime(file_time_str, '%Y-%m-%d_%H')
-            
-            # Create time range
-            n_times = len(swdown)
-            times = pd.date_range(start=start_time, periods=n_times, freq='H')
-            
-            # Create DataFrame for this file
-            df = pd.DataFrame({
-                'timestamp': times,
-                'SWDOWN': swdown.values
-            })
-            
-            all_data.append(df)
-            ds.close()
-            
-        except Exception as e:
-            print(f"Error processing file {file}: {str(e)}")
-            continue
-    
-    if not all_data:
-        return None, None
-        
-    # Combine and process all data
-    final_df = pd.concat(all_data, ignore_index=True)
-    final_df = final_df.sort_values('timestamp')
+    # Hourly series from the most recent cycle at each valid time
+    final_df = finalize_timeseries(forecasts, overlap='latest')
     
     # Add time information
-    final_df['date'] = final_df['timestamp'].dt.date
-    final_df['hour'] = final_df['timestamp'].dt.hour
-    final_df['day'] = final_df['timestamp'].dt.day
+    add_time_columns(final_df)
     
     # Calculate daily statistics
-    daily_stats = final_df.groupby('date').agg({
-        'SWDOWN': ['mean', 'max', 'min', 'std']
-    }).round(2)
+    daily_stats = daily_statistics(final_df, 'SWDOWN')
+    
+    return final_df, daily_stats, forecasts
+
+def extract_swdown_areas(wrf_dir, areas, variables=('SWDOWN',), workers=1):
+    """
+    Extract area-averaged time series for several areas in a single pass
+    
+    Parameters:
+    wrf_dir (str): Directory containing WRF output files
+    areas (dict): {name: (lat_bounds, lon_bounds)} or {name: selector}
+    variables (list): WRF variables and diagnostics to extract
+    workers (int): Number of processes reading files in parallel
     
-    return final_df, daily_stats
+    Returns:
+    DataFrame: Hourly data with one column per variable and area ({var}_{name})
+    """
+    selectors = {
+        name: area if hasattr(area, 'locate') else BBox(*area)
+        for name, area in areas.items()
+    }
+    final_df = extract_timeseries(wrf_dir, domain='d02', variables=list(variables),
+                                  selector=Regions(selectors), workers=workers)
+    if final_df is not None:
+        add_time_columns(final_df)
+    return final_df
 
 def plot_swdown_timeseries(df, daily_stats, output_prefix='zmvm'):
     """
@@ -123,13 +104,25 @@ if __name__ == "__main__":
     lon_bounds = (-99.15, -98.52)  # (min_lon, max_lon)
     
     print("Starting area analysis...")
-    df, daily_stats = extract_swdown_area(wrf_dir, lat_bounds, lon_bounds)
+    df, daily_stats, forecasts = extract_swdown_area(wrf_dir, lat_bounds, lon_bounds,
+                                                    variables=METEO_VARIABLES)
     
     if df is not None:
         print("Saving results to CSV files...")
         df.to_csv("swdown_hourly_area_timeseries.csv", index=False)
         daily_stats.to_csv("swdown_daily_area_statistics.csv")
         
+        # Write every forecast cycle to the Parquet store (year/month/domain/region)
+        # so load_forecasts and verify can select by init_time and lead_hour;
+        # load_store keeps the latest cycle. The file prefix is the output
+        # directory, so rerunning the script replaces this month's files
+        # instead of appending a second copy. The area bounds go to the
+        # store's _regions.json (region_table, load_store(...).attrs)
+        columns = ['timestamp', 'init_time', 'lead_hour'] + METEO_VARIABLES
+        append_to_store(forecasts[columns], "series_wrf", 'd02', 'zmvm',
+                        basename=os.path.basename(wrf_dir.rstrip('/')),
+                        attrs=BBox(lat_bounds, lon_bounds).describe())
+        
         print("Creating plots...")
         plot_swdown_timeseries(df, daily_stats)
         
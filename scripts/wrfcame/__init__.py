@@ -0,0 +1,73 @@
+"""
+Herramientas de post-proceso para las salidas wrfout del pronostico CAMe.
+"""
+from .aggregate import aggregate, time_keys
+from .catalog import VariableCatalog, default_catalog, scan_header
+from .diagnostics import DIAGNOSTICS, read_fields
+from .engine import (
+    add_time_columns,
+    daily_statistics,
+    extract_file,
+    extract_timeseries,
+    find_wrf_files,
+    iter_files,
+)
+from .field_cache import FieldCache, default_field_cache
+from .grid_index import REGIONS, GridIndex, default_grid_index, geometry_key, region
+from .instrument import Instrumentation
+from .inventory import Inventory, default_inventory, inspect_file
+from .polygons import Polygons, load_polygons
+from .reader import open_wrf, read_grid, read_hyperslab
+from .regions import Regions
+from .selectors import BBox, DomainMean, Mask, Point, Selector
+from .stations import Stations, load_stations, mercator
+from .streaming import RunningDailyStats, stream_daily_statistics, stream_timeseries
+from .times import decode_times, keep_latest_init, read_times, to_local
+
+__all__ = [
+    'BBox',
+    'DIAGNOSTICS',
+    'DomainMean',
+    'FieldCache',
+    'GridIndex',
+    'Instrumentation',
+    'Inventory',
+    'Mask',
+    'Point',
+    'Polygons',
+    'REGIONS',
+    'Regions',
+    'RunningDailyStats',
+    'Selector',
+    'Stations',
+    'VariableCatalog',
+    'add_time_columns',
+    'aggregate',
+    'daily_statistics',
+    'decode_times',
+    'default_catalog',
+    'default_field_cache',
+    'default_grid_index',
+    'default_inventory',
+    'extract_file',
+    'extract_timeseries',
+    'find_wrf_files',
+    'geometry_key',
+    'inspect_file',
+    'iter_files',
+    'keep_latest_init',
+    'load_polygons',
+    'load_stations',
+    'mercator',
+    'open_wrf',
+    'read_grid',
+    'read_fields',
+    'read_hyperslab',
+    'read_times',
+    'region',
+    'scan_header',
+    'stream_daily_statistics',
+    'stream_timeseries',
+    'time_keys',
+    'to_local',
+]
@@ -0,0 +1,130 @@
+"""
+Agregados diarios, mensuales y climatologias de las series de tiempo.
+
+Los scripts calculaban los estadisticos diarios con groupby('date') y
+elegian el mes editando a mano final_df['month'] == 3/4/5. aggregate
+calcula en una sola pasada, para cualquier conjunto de meses, los
+productos de PRODUCTS:
+
+    daily                estadisticos por dia
+    monthly              estadisticos por mes (anio-mes)
+    hourly_climatology   estadisticos por (mes del anio, hora del dia) de
+                         todos los anios de la serie
+    anomaly              serie horaria menos el promedio de la climatologia
+                         horaria de su (mes, hora)
+
+Las llaves de grupo son enteros sacados de los datetime64 de 'timestamp'
+(dias y meses desde 1970, mes del anio y hora del dia) y no objetos date
+de Python ni columnas de texto:
+
+    products = aggregate(final_df, ['SWDOWN', 'T2'], months=[3, 4, 5])
+    products['daily']['SWDOWN']['max']
+"""
+import numpy as np
+import pandas as pd
+
+PRODUCTS = ('daily', 'monthly', 'hourly_climatology', 'anomaly')
+
+# Columnas de tiempo que no son variables (ver add_time_columns y load_forecasts)
+TIME_COLUMNS = ('timestamp', 'init_time', 'lead_hour', 'date', 'hour', 'day', 'month')
+
+
+def time_keys(timestamps):
+    """
+    Llaves enteras de agrupacion de una serie de tiempos.
+
+    Con zona horaria (ver to_local) las llaves son de la hora local.
+
+    Parametros:
+    timestamps (array-like): Tiempos (datetime64 o Series con dt)
+
+    Regresa:
+    dict: 'day' y 'month_index' (int32, dias y meses desde 1970-01),
+    'month' (int8, 1-12) y 'hour' (int8, 0-23)
+    """
+    index = pd.DatetimeIndex(timestamps)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    t = index.to_numpy(dtype='datetime64[ns]')
+    day = t.astype('datetime64[D]')
+    month_index = t.astype('datetime64[M]').astype(np.int64)
+    return {
+        'day': day.astype(np.int64).astype(np.int32),
+        'month_index': month_index.astype(np.int32),
+        'month': (month_index % 12 + 1).astype(np.int8),
+        'hour': ((t - day) // np.timedelta64(1, 'h')).astype(np.int8),
+    }
+
+
+def _stats(values, keys, stats, names):
+    """Estadisticos por grupo de todas las columnas de `values` a la vez."""
+    table = values.groupby(keys, sort=True).agg(list(stats))
+    table.index.names = names
+    return table
+
+
+def aggregate(df, variables=None, months=None, products=PRODUCTS,
+              stats=('mean', 'max', 'min', 'std'), decimals=2):
+    """
+    Calcula los productos agregados de una serie horaria en una pasada.
+
+    Parametros:
+    df (pandas.DataFrame): Serie con columna 'timestamp' (resultado de
+        extract_timeseries, load_store, ...)
+    variables (list, optional): Columnas a agregar; por omision todas las
+        numericas que no son de tiempo (incluye las de regiones o
+        estaciones, p. ej. SWDOWN_zmvm)
+    months (list, optional): Meses del anio a considerar (p. ej. [3, 4, 5]);
+        None = todos
+    products (list): Productos a calcular (ver PRODUCTS)
+    stats (list): Estadisticos de pandas por grupo ('mean', 'max', 'min',
+        'std', 'count', 'sum', 'median', ...)
+    decimals (int, optional): Decimales de los estadisticos; None = sin
+        redondear
+
+    Regresa:
+    dict: {producto: DataFrame}. daily tiene indice 'date' (fecha local),
+    monthly indice 'month' (primer dia del mes), hourly_climatology indice
+    (month, hour); los tres con columnas (variable, estadistico) como
+    daily_statistics. anomaly tiene 'timestamp' y una columna float32 por
+    variable
+    """
+    unknown = set(products) - set(PRODUCTS)
+    if unknown:
+        raise ValueError(f"Productos no reconocidos: {sorted(unknown)}")
+    if variables is None:
+        variables = [c for c in df.select_dtypes('number').columns if c not in TIME_COLUMNS]
+    variables = list(variables)
+
+    keys = time_keys(df['timestamp'])
+    if months is not None:
+        keep = np.isin(keys['month'], list(months))
+        df = df[keep]
+        keys = {name: key[keep] for name, key in keys.items()}
+    values = df[variables].reset_index(drop=True)
+
+    def rounded(table):
+        return table if decimals is None else table.round(decimals)
+
+    result = {}
+    if 'daily' in products:
+        table = _stats(values, keys['day'], stats, ['date'])
+        table.index = pd.DatetimeIndex(table.index.to_numpy().astype('datetime64[D]')
+                                       .astype('datetime64[ns]'), name='date')
+        result['daily'] = rounded(table)
+    if 'monthly' in products:
+        table = _stats(values, keys['month_index'], stats, ['month'])
+        table.index = pd.DatetimeIndex(table.index.to_numpy().astype('datetime64[M]')
+                                       .astype('datetime64[ns]'), name='month')
+        result['monthly'] = rounded(table)
+    if 'hourly_climatology' in products:
+        table = _stats(values, [keys['month'], keys['hour']], stats, ['month', 'hour'])
+        result['hourly_climatology'] = rounded(table)
+    if 'anomaly' in products:
+        # Promedio de la climatologia de cada (mes, hora) llevado a cada fila
+        slot = keys['month'].astype(np.int16) * 24 + keys['hour']
+        mean = values.groupby(slot).transform('mean')
+        anomaly = (values - mean).astype(np.float32)
+        anomaly.insert(0, 'timestamp', df['timestamp'].reset_index(drop=True))
+        result['anomaly'] = anomaly
+    return result
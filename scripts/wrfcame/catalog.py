@@ -0,0 +1,259 @@
+"""
+Catalogo de variables de los wrfout a partir de sus encabezados.
+
+Para saber que variables hay en un archivo (como ex_rad_vars.py y
+dataset_vars.py) solo hace falta el encabezado NetCDF: nombre, dimensiones,
+forma, unidades y descripcion. scan_header abre el archivo con open_wrf sin
+leer ningun dato, y VariableCatalog guarda el resultado de todo un archivo
+de salidas en <cache_dir>/catalog.json.
+
+Todos los wrfout de una misma configuracion tienen las mismas variables,
+asi que el catalogo guarda cada conjunto distinto de variables (esquema)
+una sola vez y por archivo solo su esquema, tamanio, mtime, numero de
+tiempos e inicio del pronostico. Actualizar el catalogo solo lee los
+encabezados de los archivos nuevos o modificados, en paralelo, y buscar
+"todos los campos de radiacion en 3 anios de salidas" no abre ningun
+archivo:
+
+    catalog = default_catalog()
+    catalog.update(find_wrf_files('/LUSTRE/.../Salidas_WRF_2022', 'd02'), workers=8)
+    catalog.search('shortwave')
+    catalog.search(regex=r'^(SW|LW)')
+"""
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import pandas as pd
+
+from .config import cache_dir, is_stale, read_json, write_json_atomic
+from .reader import open_wrf
+from .times import read_init_time
+
+# Campos de cada variable en el catalogo
+FIELDS = ('name', 'dims', 'shape', 'dtype', 'units', 'description', 'stagger')
+
+# Fechas en unidades/descripciones (XTIME: 'minutes since 2022-05-02 00:00:00')
+DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}[ _T]\d{2}:\d{2}:\d{2}')
+
+
+def scan_header(path):
+    """
+    Lee los metadatos de las variables de un wrfout sin leer datos.
+
+    La longitud de la dimension Time se guarda aparte ('n_times') y en
+    'shape' queda como None, para que los archivos de 48 h y de 120 h con
+    las mismas variables compartan esquema; por lo mismo, las fechas en
+    unidades y descripciones (la de inicio en XTIME) se reemplazan por
+    '<init_time>'.
+
+    Parametros:
+    path (str): Ruta del archivo wrfout
+
+    Regresa:
+    dict: {'variables': lista de registros con FIELDS, 'n_times': int,
+    'init_time': str ISO o None}
+    """
+    ds = open_wrf(path)
+    try:
+        n_times = len(ds.dimensions['Time']) if 'Time' in ds.dimensions else None
+        variables = []
+        for name, variable in ds.variables.items():
+            attrs = set(variable.ncattrs())
+
+            def attr(key):
+                if key not in attrs:
+                    return None
+                return DATE_PATTERN.sub('<init_time>', str(variable.getncattr(key)).strip())
+
+            variables.append({
+                'name': name,
+                'dims': list(variable.dimensions),
+                'shape': [None if dim == 'Time' else len(ds.dimensions[dim])
+                          for dim in variable.dimensions],
+                'dtype': str(variable.dtype),
+                'units': attr('units'),
+                'description': attr('description'),
+                'stagger': attr('stagger'),
+            })
+        try:
+            init_time = read_init_time(ds, path).isoformat()
+        except ValueError:
+            init_time = None
+    finally:
+        ds.close()
+    return {'variables': variables, 'n_times': n_times, 'init_time': init_time}
+
+
+def _scan_safe(path):
+    """scan_header que regresa (resultado, None) o (None, mensaje de error)."""
+    try:
+        return scan_header(path), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _schema_id(variables):
+    text = json.dumps(variables, sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+class VariableCatalog:
+    """
+    Catalogo persistente de variables por archivo wrfout.
+
+    Parametros:
+    path (str, optional): Archivo JSON del catalogo; None = solo en memoria
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._data = read_json(path, {'schemas': {}, 'files': {}})
+
+    def is_stale(self, path):
+        """True si el archivo no esta en el catalogo o cambio desde entonces."""
+        return is_stale(self._data['files'].get(os.path.abspath(path)), path)
+
+    def update(self, wrf_files, workers=1):
+        """
+        Lee los encabezados de los archivos nuevos o modificados.
+
+        Parametros:
+        wrf_files (list): Rutas de los archivos wrfout
+        workers (int): Procesos para leer encabezados en paralelo (1 = en
+            serie, None = todos los CPUs disponibles)
+
+        Regresa:
+        int: Numero de archivos leidos en esta llamada
+        """
+        pending = [f for f in wrf_files if self.is_stale(f)]
+        print(f"Existen {len(wrf_files)} archivos de salidas de WRF, "
+              f"{len(pending)} nuevos o modificados")
+        if workers == 1 or len(pending) < 2:
+            results = map(_scan_safe, pending)
+            self._add_all(pending, results)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = pool.map(_scan_safe, pending, chunksize=16)
+                self._add_all(pending, results)
+        self.save()
+        return len(pending)
+
+    def _add_all(self, paths, results):
+        for path, (header, error) in zip(paths, results):
+            if error is not None:
+                print(f"Error file {path}: {error}")
+                continue
+            self.add(path, header)
+
+    def add(self, path, header):
+        """Registra el resultado de scan_header para un archivo."""
+        schema = _schema_id(header['variables'])
+        self._data['schemas'].setdefault(schema, header['variables'])
+        st = os.stat(path)
+        self._data['files'][os.path.abspath(path)] = {
+            'size': st.st_size,
+            'mtime': st.st_mtime,
+            'schema': schema,
+            'n_times': header['n_times'],
+            'init_time': header['init_time'],
+        }
+
+    def files(self):
+        """
+        Archivos del catalogo.
+
+        Regresa:
+        pandas.DataFrame: Una fila por archivo (path, size, mtime, schema,
+        n_times, init_time), ordenada por path
+        """
+        rows = [{'path': path, **entry} for path, entry in self._data['files'].items()]
+        df = pd.DataFrame(rows, columns=['path', 'size', 'mtime', 'schema', 'n_times', 'init_time'])
+        df['init_time'] = pd.to_datetime(df['init_time'])
+        return df.sort_values('path', ignore_index=True)
+
+    def variables(self):
+        """
+        Variables distintas de todo el catalogo.
+
+        Una variable aparece una vez por cada definicion distinta (p. ej. si
+        cambian las unidades o los niveles entre configuraciones), con el
+        numero de archivos que la tienen y el rango de inicios de pronostico.
+
+        Regresa:
+        pandas.DataFrame: Columnas FIELDS, n_files, first_init y last_init
+        """
+        files = self.files()
+        coverage = files.groupby('schema').agg(n_files=('path', 'size'),
+                                               first_init=('init_time', 'min'),
+                                               last_init=('init_time', 'max'))
+        rows = [
+            {**record, 'schema': schema}
+            for schema, records in self._data['schemas'].items()
+            if schema in coverage.index
+            for record in records
+        ]
+        columns = list(FIELDS) + ['schema']
+        df = pd.DataFrame(rows, columns=columns).join(coverage, on='schema')
+        df['dims'] = df['dims'].map(', '.join)
+        df['shape'] = df['shape'].map(lambda s: str(tuple('Time' if n is None else n for n in s)))
+
+        keys = list(FIELDS)
+        return (df.groupby(keys, dropna=False, sort=True)
+                .agg(n_files=('n_files', 'sum'), first_init=('first_init', 'min'),
+                     last_init=('last_init', 'max'))
+                .reset_index())
+
+    def search(self, *keywords, regex=None, fields=('name', 'description')):
+        """
+        Busca variables por palabras clave o expresion regular.
+
+        Parametros:
+        keywords (str): Palabras que deben aparecer (sin distinguir
+            mayusculas) en alguno de `fields`; con varias, basta una
+        regex (str, optional): Expresion regular (re.search, sin distinguir
+            mayusculas) sobre `fields`
+        fields (tuple): Campos donde se busca ('name', 'description', 'units')
+
+        Regresa:
+        pandas.DataFrame: Filas de variables() que coinciden
+        """
+        df = self.variables()
+        match = pd.Series(not keywords and regex is None, index=df.index)
+        for field in fields:
+            text = df[field].fillna('')
+            for keyword in keywords:
+                match |= text.str.contains(keyword, case=False, regex=False)
+            if regex is not None:
+                match |= text.str.contains(regex, case=False, regex=True)
+        return df[match].reset_index(drop=True)
+
+    def files_with(self, name):
+        """
+        Archivos que tienen la variable `name`.
+
+        Regresa:
+        pandas.DataFrame: Filas de files()
+        """
+        schemas = [schema for schema, records in self._data['schemas'].items()
+                   if any(record['name'] == name for record in records)]
+        files = self.files()
+        return files[files['schema'].isin(schemas)].reset_index(drop=True)
+
+    def save(self):
+        """
+        Escribe el catalogo en disco (reemplazo atomico del archivo JSON).
+        """
+        if self.path is not None:
+            write_json_atomic(self.path, self._data)
+
+
+@lru_cache(maxsize=None)
+def default_catalog():
+    """
+    Catalogo compartido del proceso en <cache_dir>/catalog.json.
+    """
+    return VariableCatalog(os.path.join(cache_dir(), 'catalog.json'))
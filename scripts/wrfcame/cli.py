@@ -0,0 +1,483 @@
+"""
+Linea de comandos del post-proceso (reemplaza a extract_swdown.sh).
+
+Lee directamente del wrfout binario la ventana de las variables pedidas y
+escribe CSV o Parquet (segun la extension de --output) en un solo paso,
+sin archivos temporales ni volcados de texto con ncdump. Ejemplos, desde
+scripts/:
+
+    python -m wrfcame dump /LUSTRE/.../wrfout_d01_2022-05-01_00.nc -o swdown_values.csv
+    python -m wrfcame extract '/LUSTRE/.../wrfout_d02_2022-05-*.nc' --region came \\
+        --var SWDOWN T2 WSPD10 --tz America/Mexico_City -o came_mayo_2022.parquet
+    python -m wrfcame rechunk wrfout_d02_2024-05-01_00.nc -o /LUSTRE/.../series_d02.zarr
+    python -m wrfcame inventory '/LUSTRE/ID/hidromet/WRF/Salidas_WRF_*' --domain d02
+    python -m wrfcame catalog '/LUSTRE/.../Salidas_WRF_*/wrfout_d02_*.nc' --search shortwave
+    python -m wrfcame verify series_wrf rama_o3.csv --region zmvm --var SWDOWN \\
+        --tz America/Mexico_City -o metricas_o3_swdown.csv
+    python -m wrfcame aggregate came_mayo_2022.parquet --months 5 -o came_mayo_2022.csv
+
+`dump` escribe el valor de cada celda por tiempo (formato largo: Time,
+south_north, west_east, XLAT, XLONG y una columna por variable); `extract`
+escribe la serie reducida por el selector (promedio de area, punto o
+estaciones), igual que extract_timeseries; `verify` compara los
+pronosticos de un almacen Parquet con todos los ciclos (init_time; lo
+escriben time_series_wrf_zmvm.py y extract_incremental) con una tabla de
+observaciones y escribe las metricas por estacion, mes y plazo (ver
+verification.py); `aggregate` calcula los estadisticos diarios, mensuales,
+la climatologia por mes y hora y las anomalias de una serie para los meses
+pedidos (ver aggregate.py); `catalog` busca variables en los encabezados
+de los archivos (ver catalog.py) e `inventory` revisa los directorios de
+salidas y reporta archivos con error y huecos en la cobertura (ver
+inventory.py); `extract` usa el mismo inventario para omitir de antemano
+los archivos truncados o con error (--no-inventory lo desactiva). `rechunk`
+copia los campos de superficie de cada pronostico a un almacen fragmentado
+para series de tiempo (ver rechunk.py). `extract --field-cache` lee los
+campos de un cache local de arreglos .npy mapeados en memoria (ver
+field_cache.py).
+"""
+import argparse
+import glob
+import os
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+
+from .aggregate import PRODUCTS as AGGREGATE_PRODUCTS, aggregate
+from .catalog import VariableCatalog, default_catalog
+from .diagnostics import read_fields
+from .engine import finalize_timeseries, iter_files
+from .field_cache import DEFAULT_BUDGET_MB, FieldCache
+from .grid_index import REGIONS, default_grid_index, region
+from .instrument import Instrumentation
+from .inventory import Inventory, default_inventory
+from .polygons import Polygons, load_polygons
+from .reader import open_wrf, read_grid
+from .rechunk import SURFACE_FIELDS, rechunk_file
+from .selectors import BBox, DomainMean, Point
+from .stations import Stations, load_stations
+from .times import read_times
+
+
+def expand_paths(patterns):
+    """
+    Expande rutas y patrones glob a una lista ordenada de archivos unicos.
+    """
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        if not matches and not glob.has_magic(pattern):
+            matches = [pattern]
+        files.extend(matches)
+    files = list(dict.fromkeys(files))
+    missing = [f for f in files if not os.path.exists(f)]
+    if missing:
+        raise FileNotFoundError(f"Archivos no encontrados: {missing}")
+    return files
+
+
+def selector_from_args(args):
+    """Selector espacial a partir de --region/--bbox/--point/--stations/--polygons."""
+    if args.region:
+        return region(args.region)
+    if args.bbox:
+        lat_min, lat_max, lon_min, lon_max = args.bbox
+        return BBox((lat_min, lat_max), (lon_min, lon_max))
+    if args.point:
+        return Point(*args.point)
+    if args.stations:
+        return Stations(load_stations(args.stations))
+    if args.polygons:
+        return Polygons(load_polygons(args.polygons, args.name_field))
+    return DomainMean()
+
+
+class TableWriter:
+    """
+    Escribe bloques de DataFrame a un CSV o Parquet conforme se generan.
+
+    Parametros:
+    path (str): Archivo de salida; '.parquet' escribe Parquet, lo demas CSV
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.endswith('.parquet')
+        self.rows = 0
+        self._writer = None
+
+    def write(self, df):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='w' if self.rows == 0 else 'a',
+                      header=self.rows == 0, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def dump_file(path, variables=('SWDOWN',), selector=None, grid_index=None):
+    """
+    Valores por celda y tiempo de un wrfout, en formato largo.
+
+    Parametros:
+    path (str): Ruta del archivo wrfout
+    variables (list): Variables del wrfout y/o diagnosticos
+    selector (Selector): Solo se usa su ventana (y su mascara, si tiene);
+        None = todo el dominio
+    grid_index (GridIndex, optional): Cache de ventanas de lectura
+
+    Regresa:
+    pandas.DataFrame: Columnas Time, south_north, west_east, XLAT, XLONG y
+    una por variable
+    """
+    selector = selector or DomainMean()
+    grid_index = grid_index or default_grid_index()
+
+    ds = open_wrf(path)
+    try:
+        footprint = grid_index.footprint(ds, selector)
+        lats, lons = read_grid(ds)
+        y0 = range(*footprint.y.indices(lats.shape[0])).start
+        x0 = range(*footprint.x.indices(lats.shape[1])).start
+        lats = lats[footprint.y, footprint.x]
+        lons = lons[footprint.y, footprint.x]
+        jj, ii = np.indices(lats.shape)
+        if footprint.cells is not None:
+            keep = (footprint.cells[:, 0], footprint.cells[:, 1])
+        elif footprint.mask is not None:
+            keep = np.nonzero(footprint.mask)
+        elif footprint.weights is not None:
+            keep = np.unravel_index(np.unique(footprint.weights.indices), lats.shape)
+        else:
+            keep = (jj.ravel(), ii.ravel())
+
+        columns = {}
+        for var, block in read_fields(ds, variables, footprint.y, footprint.x):
+            columns[var] = block[:, keep[0], keep[1]]
+        n_times = len(next(iter(columns.values())))
+        times = read_times(ds, path, n_times)
+    finally:
+        ds.close()
+
+    n_cells = len(keep[0])
+    df = pd.DataFrame({
+        'Time': np.repeat(times, n_cells),
+        'south_north': np.tile(keep[0] + y0, n_times).astype(np.int16),
+        'west_east': np.tile(keep[1] + x0, n_times).astype(np.int16),
+        'XLAT': np.tile(lats[keep], n_times),
+        'XLONG': np.tile(lons[keep], n_times),
+    })
+    for var, values in columns.items():
+        df[var] = values.ravel()
+    return df
+
+
+def cmd_dump(args):
+    files = expand_paths(args.files)
+    selector = selector_from_args(args)
+    writer = TableWriter(args.output)
+    try:
+        for file in files:
+            print(f"Procesando archivo: {os.path.basename(file)}")
+            writer.write(dump_file(file, args.var, selector))
+    finally:
+        writer.close()
+    print(f"{writer.rows} filas escritas en {args.output}")
+
+
+def cmd_extract(args):
+    files = expand_paths(args.files)
+    print(f"Existen {len(files)} archivos de salidas de WRF ")
+    if args.inventory:
+        # Los archivos truncados o con error se omiten antes de leer
+        files = default_inventory().check(files, args.workers)
+    selector = selector_from_args(args)
+    instrumentation = None
+    if args.instrument or args.instrument_log:
+        instrumentation = Instrumentation(args.instrument_log)
+    field_cache = FieldCache(budget_mb=args.cache_budget) if args.field_cache else None
+    frames = [df for _, df in iter_files(files, args.var, selector, args.workers,
+                                         instrumentation, field_cache)]
+    if not frames:
+        print("No se pudo procesar ningun archivo")
+        if instrumentation is not None:
+            instrumentation.report()
+        return 1
+    with instrumentation.stage('concat') if instrumentation else nullcontext():
+        df = finalize_timeseries(pd.concat(frames, ignore_index=True),
+                                 args.start, args.end, args.tz, args.overlap)
+    if instrumentation is not None:
+        instrumentation.report()
+    writer = TableWriter(args.output)
+    try:
+        writer.write(df)
+    finally:
+        writer.close()
+    print(f"{writer.rows} filas escritas en {args.output}")
+
+
+def cmd_catalog(args):
+    catalog = VariableCatalog(args.cache) if args.cache else default_catalog()
+    catalog.update(expand_paths(args.files), args.workers)
+    if args.search or args.regex:
+        df = catalog.search(*(args.search or []), regex=args.regex)
+    else:
+        df = catalog.variables()
+    if args.output:
+        writer = TableWriter(args.output)
+        try:
+            writer.write(df)
+        finally:
+            writer.close()
+        print(f"{writer.rows} filas escritas en {args.output}")
+    else:
+        with pd.option_context('display.max_rows', None, 'display.width', 200,
+                               'display.max_colwidth', 60):
+            print(df.to_string(index=False))
+
+
+def cmd_rechunk(args):
+    files = expand_paths(args.files)
+    print(f"Existen {len(files)} archivos de salidas de WRF ")
+    errors = 0
+    for file in files:
+        print(f"Procesando archivo: {os.path.basename(file)}")
+        try:
+            rechunk_file(file, args.output, args.var)
+        except Exception as e:
+            print(f"Error file {file}: {e}")
+            errors += 1
+    return 1 if errors else 0
+
+
+def cmd_inventory(args):
+    inventory = Inventory(args.cache) if args.cache else default_inventory()
+    checked = inventory.refresh(args.directories, args.workers)
+    files = inventory.files(domain=args.domain)
+    print(f"Existen {len(files)} archivos de salidas de WRF, {checked} revisados en esta corrida")
+    if args.output:
+        writer = TableWriter(args.output)
+        try:
+            writer.write(files)
+        finally:
+            writer.close()
+        print(f"{writer.rows} filas escritas en {args.output}")
+
+    summary = files.groupby(['directory', 'domain']).agg(
+        archivos=('path', 'size'), con_error=('valid', lambda v: int((~v).sum())),
+        primer_tiempo=('first_time', 'min'), ultimo_tiempo=('last_time', 'max'),
+        GB=('size', lambda v: round(v.sum() / 2 ** 30, 2)))
+    print(summary.to_string())
+
+    bad = inventory.bad_files(domain=args.domain)
+    if not bad.empty:
+        print("\nArchivos con error:")
+        print(bad.to_string(index=False))
+    for domain in sorted(files['domain'].dropna().unique()):
+        gaps = inventory.gaps(domain=domain, start=args.start, end=args.end)
+        if not gaps.empty:
+            print(f"\nHuecos en {domain}:")
+            print(gaps.to_string(index=False))
+    return 1 if not bad.empty else 0
+
+
+def read_table(path):
+    """Lee una tabla CSV o Parquet (segun la extension)."""
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def cmd_verify(args):
+    from .verification import verify
+
+    leads = tuple(args.leads) if args.leads else None
+    metrics = verify(args.store, read_table(args.observations), args.var, args.region,
+                     args.domain, args.start, args.end, leads, args.tz, args.value,
+                     args.lead_step)
+    writer = TableWriter(args.output)
+    try:
+        writer.write(metrics.reset_index())
+    finally:
+        writer.close()
+    print(f"{writer.rows} filas escritas en {args.output}")
+
+
+def table_times(values, tz=None):
+    """
+    Tiempos de una tabla leida con read_table, sin zona.
+
+    Los tiempos sin desfase se usan tal cual: ya estan en la hora con la
+    que se escribio la tabla (extract --tz escribe hora local sin zona). Los
+    que tienen desfase (p. ej. '2022-05-01 00:00:00-05:00') se convierten a
+    la hora de `tz` (UTC si es None).
+    """
+    try:
+        times = pd.to_datetime(values)
+    except ValueError:
+        # Desfases distintos en la misma columna (horario de verano)
+        times = pd.to_datetime(values, utc=True)
+    if times.dt.tz is None:
+        return times
+    return times.dt.tz_convert(tz or 'UTC').dt.tz_localize(None)
+
+
+def cmd_aggregate(args):
+    df = read_table(args.table)
+    df['timestamp'] = table_times(df['timestamp'], args.tz)
+    products = aggregate(df, args.var, args.months, args.products, args.stats)
+    base, ext = os.path.splitext(args.output)
+    for name, table in products.items():
+        if isinstance(table.columns, pd.MultiIndex):
+            table = table.copy()
+            table.columns = [f"{var}_{stat}" for var, stat in table.columns]
+            table = table.reset_index()
+        path = f"{base}_{name}{ext or '.csv'}"
+        writer = TableWriter(path)
+        try:
+            writer.write(table)
+        finally:
+            writer.close()
+        print(f"{writer.rows} filas escritas en {path}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m wrfcame',
+        description='Post-proceso de salidas wrfout del pronostico CAMe',
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    dump = commands.add_parser('dump', help='Valores por celda y tiempo (reemplaza extract_swdown.sh)')
+    extract = commands.add_parser('extract', help='Series reducidas por area, punto o estaciones')
+    for sub in (dump, extract):
+        sub.add_argument('files', nargs='+', help='Archivos wrfout o patrones glob')
+        sub.add_argument('--var', nargs='+', default=['SWDOWN'],
+                         help='Variables del wrfout y/o diagnosticos (default: SWDOWN)')
+        sub.add_argument('-o', '--output', required=True,
+                         help='Archivo de salida (.csv o .parquet)')
+        area = sub.add_mutually_exclusive_group()
+        area.add_argument('--region', choices=sorted(REGIONS), help='Region con nombre')
+        area.add_argument('--bbox', nargs=4, type=float,
+                          metavar=('LAT_MIN', 'LAT_MAX', 'LON_MIN', 'LON_MAX'))
+        area.add_argument('--point', nargs=2, type=float, metavar=('LAT', 'LON'))
+        area.add_argument('--stations', help='Catalogo de estaciones en CSV (cve_estac, latitud, longitud)')
+        area.add_argument('--polygons', help='Poligonos en GeoJSON o shapefile (promedio ponderado por area)')
+        sub.add_argument('--name-field', default='name',
+                         help='Atributo con el nombre de cada poligono (default: name)')
+
+    extract.add_argument('--start', help='Inicio de la ventana de tiempo (inclusive)')
+    extract.add_argument('--end', help='Fin de la ventana de tiempo (inclusive)')
+    extract.add_argument('--tz', help='Zona horaria IANA de la salida (default: UTC)')
+    extract.add_argument('--overlap', choices=['latest', 'all'], default='latest')
+    extract.add_argument('--workers', type=int, default=1,
+                         help='Procesos para leer archivos en paralelo')
+    extract.add_argument('--instrument', action='store_true',
+                         help='Mide las etapas por archivo e imprime un resumen al final')
+    extract.add_argument('--instrument-log', metavar='PATH',
+                         help='Ademas escribe un registro JSON por archivo (JSON Lines)')
+    extract.add_argument('--no-inventory', dest='inventory', action='store_false',
+                         help='No revisa los archivos con el inventario (por omision se '
+                              'omiten los truncados o con error; ver inventory)')
+    extract.add_argument('--field-cache', action='store_true',
+                         help='Lee los campos de un cache local .npy (se llena la primera vez)')
+    extract.add_argument('--cache-budget', type=float, default=DEFAULT_BUDGET_MB,
+                         help=f'Espacio maximo del cache de campos en MB (default: {DEFAULT_BUDGET_MB})')
+
+    verify = commands.add_parser('verify', help='Metricas de los pronosticos contra observaciones')
+    verify.add_argument('store',
+                        help='Almacen Parquet con todos los ciclos (columnas init_time y lead_hour), '
+                             'como el que escriben time_series_wrf_zmvm.py y extract_incremental')
+    verify.add_argument('observations',
+                        help='Observaciones CSV o Parquet: timestamp, station y valor, '
+                             'o timestamp y una columna por estacion')
+    verify.add_argument('--var', default='SWDOWN', help='Variable del modelo (default: SWDOWN)')
+    verify.add_argument('--region', required=True, help='Region del almacen')
+    verify.add_argument('--domain', default='d02')
+    verify.add_argument('--value', default='obs',
+                        help='Columna del valor en observaciones en formato largo (default: obs)')
+    verify.add_argument('--start', help='Inicio de los tiempos validos (default: el de las observaciones)')
+    verify.add_argument('--end', help='Fin de los tiempos validos (default: el de las observaciones)')
+    verify.add_argument('--leads', nargs=2, type=int, metavar=('MIN', 'MAX'),
+                        help='Plazos de pronostico en horas (inclusive)')
+    verify.add_argument('--lead-step', type=int, default=24,
+                        help='Ancho en horas de los grupos de plazo (default: 24)')
+    verify.add_argument('--tz', help='Zona horaria de las observaciones (default: UTC)')
+    verify.add_argument('-o', '--output', required=True,
+                        help='Tabla de metricas (.csv o .parquet)')
+
+    aggregate = commands.add_parser('aggregate',
+                                    help='Agregados diarios, mensuales, climatologia horaria y anomalias')
+    aggregate.add_argument('table', help='Serie horaria CSV o Parquet (p. ej. la salida de extract)')
+    aggregate.add_argument('--var', nargs='+',
+                           help='Columnas a agregar (default: todas las numericas)')
+    aggregate.add_argument('--months', nargs='+', type=int, metavar='MONTH',
+                           help='Meses del anio a considerar (p. ej. 3 4 5; default: todos)')
+    aggregate.add_argument('--products', nargs='+', choices=list(AGGREGATE_PRODUCTS),
+                           default=list(AGGREGATE_PRODUCTS), help='Productos (default: todos)')
+    aggregate.add_argument('--stats', nargs='+', default=['mean', 'max', 'min', 'std'],
+                           help='Estadisticos por grupo (default: mean max min std)')
+    aggregate.add_argument('--tz',
+                           help='Zona horaria a la que se convierten los tiempos con desfase; '
+                                'los tiempos sin desfase (como los de extract --tz) se usan '
+                                'tal cual (default: UTC)')
+    aggregate.add_argument('-o', '--output', required=True,
+                           help='Prefijo de salida: swdown.csv escribe swdown_daily.csv, '
+                                'swdown_monthly.csv, ...')
+
+    catalog = commands.add_parser('catalog', help='Variables de los encabezados (sin leer datos)')
+    catalog.add_argument('files', nargs='+', help='Archivos wrfout o patrones glob')
+    catalog.add_argument('--search', nargs='+', metavar='WORD',
+                         help='Palabras clave en el nombre o la descripcion')
+    catalog.add_argument('--regex', help='Expresion regular sobre el nombre o la descripcion')
+    catalog.add_argument('--workers', type=int, default=1,
+                         help='Procesos para leer encabezados en paralelo')
+    catalog.add_argument('--cache', help='Archivo JSON del catalogo (default: <cache>/catalog.json)')
+    catalog.add_argument('-o', '--output', help='Archivo de salida (.csv o .parquet); default: pantalla')
+
+    rechunk = commands.add_parser('rechunk',
+                                  help='Campos de superficie a un almacen fragmentado por series de tiempo')
+    rechunk.add_argument('files', nargs='+', help='Archivos wrfout o patrones glob')
+    rechunk.add_argument('--var', nargs='+', default=list(SURFACE_FIELDS),
+                         help=f"Campos 2D a copiar (default: {' '.join(SURFACE_FIELDS)})")
+    rechunk.add_argument('-o', '--output', required=True,
+                         help="Almacen de salida ('.zarr' = Zarr, otro = NetCDF4); se crea o se agrega")
+
+    inventory = commands.add_parser('inventory', help='Inventario e integridad de los wrfout')
+    inventory.add_argument('directories', nargs='+',
+                           help='Directorios de salidas o patrones glob (p. ej. Salidas_WRF_*)')
+    inventory.add_argument('--domain', help='Solo este dominio')
+    inventory.add_argument('--start', help='Inicio de la ventana para buscar huecos (UTC)')
+    inventory.add_argument('--end', help='Fin de la ventana para buscar huecos (UTC)')
+    inventory.add_argument('--workers', type=int, default=1,
+                           help='Procesos para revisar archivos en paralelo')
+    inventory.add_argument('--cache', help='Archivo JSON del inventario (default: <cache>/inventory.json)')
+    inventory.add_argument('-o', '--output', help='Tabla de archivos (.csv o .parquet)')
+
+    dump.set_defaults(func=cmd_dump)
+    extract.set_defaults(func=cmd_extract)
+    verify.set_defaults(func=cmd_verify)
+    aggregate.set_defaults(func=cmd_aggregate)
+    catalog.set_defaults(func=cmd_catalog)
+    inventory.set_defaults(func=cmd_inventory)
+    rechunk.set_defaults(func=cmd_rechunk)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except FileNotFoundError as e:
+        # Rutas de entrada que no existen: mensaje y codigo de error, sin traza
+        print(f"Error: {e}")
+        return 1
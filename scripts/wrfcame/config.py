@@ -0,0 +1,76 @@
+"""
+Configuracion comun de wrfcame: directorio de caches y lectura y escritura
+de sus archivos JSON.
+"""
+import json
+import os
+
+
+def cache_dir():
+    """
+    Directorio de caches persistentes de wrfcame.
+
+    Se toma de la variable de entorno WRFCAME_CACHE o, si no existe, de
+    ~/.cache/wrfcame. El directorio se crea si no existe.
+
+    Regresa:
+    str: Ruta del directorio de cache
+    """
+    path = os.environ.get('WRFCAME_CACHE',
+                          os.path.join(os.path.expanduser('~'), '.cache', 'wrfcame'))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def read_json(path, default=None):
+    """
+    Contenido de un archivo JSON de los caches y almacenes de wrfcame.
+
+    Parametros:
+    path (str): Ruta del archivo; None = sin archivo (solo en memoria)
+    default: Valor si el archivo no existe
+
+    Regresa:
+    Objeto leido, o `default`
+    """
+    if path is None or not os.path.exists(path):
+        return default
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_json_atomic(path, data, indent=None):
+    """
+    Escribe `data` como JSON con reemplazo atomico.
+
+    Se escribe a un temporal por proceso y se renombra: otro proceso lee el
+    archivo anterior o el nuevo completo, nunca uno a medias.
+
+    Parametros:
+    path (str): Ruta del archivo (el directorio se crea si no existe)
+    data: Objeto serializable a JSON
+    indent (int, optional): Sangria del JSON
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=indent)
+    os.replace(tmp, path)
+
+
+def is_stale(entry, path, st=None):
+    """
+    True si no hay registro de un archivo o el archivo cambio desde entonces.
+
+    Parametros:
+    entry (dict, None): Registro con el 'size' y 'mtime' del archivo
+    path (str): Ruta del archivo
+    st (os.stat_result, optional): Resultado de os.stat(path), si ya se tiene
+
+    Regresa:
+    bool
+    """
+    if entry is None:
+        return True
+    st = st or os.stat(path)
+    return entry['size'] != st.st_size or entry['mtime'] != st.st_mtime
@@ -0,0 +1,105 @@
+"""
+Variables y diagnosticos que se pueden pedir en la extraccion.
+
+Ademas de las variables del wrfout (SWDOWN, T2, Q2, U10, V10, PBLH, ...),
+se pueden pedir diagnosticos calculados celda por celda antes de la
+reduccion espacial (la rapidez del viento se promedia como rapidez, no como
+componentes). Cada variable del archivo se lee una sola vez por archivo
+aunque la usen varias columnas (p. ej. U10 y WSPD10).
+"""
+from collections import Counter
+
+import numpy as np
+
+from .instrument import NULL_TIMER
+from .reader import read_hyperslab
+
+
+def wind_speed(u, v):
+    """Rapidez del viento a partir de sus componentes."""
+    return np.hypot(u, v)
+
+
+def column_max(field):
+    """Maximo en la vertical de un campo (Time, bottom_top, y, x)."""
+    return field.max(axis=1)
+
+
+def kelvin_to_celsius(field):
+    """Temperatura en grados Celsius."""
+    return field - np.float32(273.15)
+
+
+# Diagnosticos: nombre -> (variables del wrfout que usa, funcion)
+DIAGNOSTICS = {
+    'WSPD10': (('U10', 'V10'), wind_speed),
+    # Fraccion de nube total con traslape maximo entre niveles
+    'CLDFRA_TOT': (('CLDFRA',), column_max),
+    'T2C': (('T2',), kelvin_to_celsius),
+}
+
+
+def inputs(name):
+    """Variables del wrfout necesarias para una variable o diagnostico."""
+    if name in DIAGNOSTICS:
+        return DIAGNOSTICS[name][0]
+    return (name,)
+
+
+def read_fields(ds, names, y=slice(None), x=slice(None), timer=NULL_TIMER):
+    """
+    Genera (nombre, bloque) para cada variable o diagnostico pedido.
+
+    Cada variable del archivo se lee una vez en la ventana (y, x) y se
+    libera en cuanto ya no la necesita ninguna de las columnas pendientes.
+
+    Parametros:
+    ds (netCDF4.Dataset): Archivo abierto con open_wrf
+    names (list): Variables del wrfout y/o nombres de DIAGNOSTICS
+    y (slice): Ventana en south_north
+    x (slice): Ventana en west_east
+    timer (FileTimer, optional): Registra las etapas read/derive y los
+        bytes leidos
+
+    Regresa:
+    Generador de (str, numpy.ndarray) con bloques (Time, y, x)
+    """
+    uses = Counter(var for name in names for var in inputs(name))
+    blocks = {}
+    for name in names:
+        arrays = []
+        for var in inputs(name):
+            if var not in blocks:
+                with timer.stage('read'):
+                    blocks[var] = read_hyperslab(ds, var, y, x)
+                timer.add_read(blocks[var].nbytes)
+            arrays.append(blocks[var])
+            uses[var] -= 1
+            if uses[var] == 0:
+                del blocks[var]
+
+        with timer.stage('derive'):
+            block = derive(name, arrays)
+        yield name, block
+
+
+def derive(name, arrays):
+    """
+    Calcula una variable o diagnostico a partir de sus variables de entrada.
+
+    Funciona igual con arreglos de NumPy que con arreglos de dask.
+
+    Parametros:
+    name (str): Variable del wrfout o nombre de DIAGNOSTICS
+    arrays (list): Bloques de las variables de inputs(name), en ese orden
+
+    Regresa:
+    Bloque (Time, y, x)
+    """
+    block = DIAGNOSTICS[name][1](*arrays) if name in DIAGNOSTICS else arrays[0]
+    if block.ndim != 3:
+        raise ValueError(
+            f"{name} tiene {block.ndim} dimensiones; para variables 3D "
+            f"usar un diagnostico de columna (p. ej. CLDFRA_TOT)"
+        )
+    return block
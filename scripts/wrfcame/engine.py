@@ -0,0 +1,352 @@
+"""
+Motor de extraccion de series de tiempo a partir de las salidas wrfout.
+
+Reune en un solo lugar el ciclo por archivo que antes estaba copiado en
+time_series_wrf.py, time_series_wrf_d2.py, time_series_wrf_zmvm.py y las
+variantes de SWDOWN_operativo_WRF_4.2.1.
+"""
+import glob
+import os
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .diagnostics import read_fields
+from .field_cache import default_field_cache
+from .grid_index import default_grid_index
+from .instrument import NULL_TIMER, FileTimer, Instrumentation
+from .inventory import Inventory, default_inventory
+from .reader import open_wrf
+from .selectors import DomainMean
+from .times import keep_latest_init, lead_hours, localize_times, read_init_time, read_times
+
+
+def find_wrf_files(wrf_dir, domain='d02', start=None, end=None, inventory=True):
+    """
+    Lista ordenada de archivos wrfout de un dominio.
+
+    Parametros:
+    wrf_dir (str): Directorio con las salidas del modelo WRF
+    domain (str): Dominio ('d01', 'd02', ...)
+    start, end (str, datetime, optional): Ventana de tiempos validos en UTC;
+        solo se usa con inventario
+    inventory (Inventory, bool): Con True (por omision, default_inventory())
+        o un Inventory (ver inventory.py) se refresca el inventario del
+        directorio (solo se revisan los archivos nuevos o modificados) y se
+        regresan solo los archivos validos que cubren [start, end]; los
+        archivos truncados o con error se reportan y se omiten antes de
+        leer. False = todos los archivos del glob, sin revisar
+
+    Regresa:
+    list: Rutas de los archivos wrfout_<domain>_*.nc
+    """
+    if not inventory:
+        return sorted(glob.glob(os.path.join(wrf_dir, f"wrfout_{domain}_*.nc")))
+    inventory = inventory if isinstance(inventory, Inventory) else default_inventory()
+    inventory.refresh(wrf_dir)
+    return inventory.plan(wrf_dir, domain, start, end)
+
+
+def utc_window(start, end, tz):
+    """
+    Ventana [start, end] para planear lecturas en UTC: con zona horaria se
+    amplia un dia y el corte exacto se hace despues de convertir.
+    """
+    margin = pd.Timedelta(days=1) if tz is not None else pd.Timedelta(0)
+    return (None if start is None else pd.Timestamp(start) - margin,
+            None if end is None else pd.Timestamp(end) + margin)
+
+
+def extract_file(path, variables=('SWDOWN',), selector=None, grid_index=None,
+                 timer=NULL_TIMER, field_cache=None):
+    """
+    Extrae las series de tiempo de un archivo wrfout.
+
+    Parametros:
+    path (str): Ruta del archivo wrfout
+    variables (list): Variables del wrfout y/o diagnosticos (ver
+        diagnostics.DIAGNOSTICS); todas salen de una sola lectura del archivo
+    selector (Selector): Seleccion espacial (None = promedio del dominio)
+    grid_index (GridIndex, optional): Cache de ventanas de lectura; por
+        omision el indice persistente de default_grid_index()
+    timer (FileTimer, optional): Registra la duracion de cada etapa, los
+        bytes leidos y el uso del indice de malla (ver instrument.py)
+    field_cache (FieldCache, optional): Cache de campos en .npy (ver
+        field_cache.py); la ventana se toma del campo mapeado en memoria y
+        el wrfout solo se abre la primera vez
+
+    Regresa:
+    pandas.DataFrame: Columna 'timestamp' (tiempo valido UTC, de la variable
+    Times), una columna float32 por variable, 'init_time' (inicio del
+    pronostico) y 'lead_hour' (horas de pronostico, int16)
+    """
+    selector = selector or DomainMean()
+    grid_index = grid_index or default_grid_index()
+    if field_cache is not None:
+        return _extract_cached(path, variables, selector, grid_index, timer, field_cache)
+
+    with timer.stage('open'):
+        ds = open_wrf(path)
+    try:
+        with timer.stage('grid'):
+            footprint = grid_index.footprint(ds, selector, timer)
+
+        columns = {}
+        for var, block in read_fields(ds, variables, footprint.y, footprint.x, timer):
+            _reduce_columns(columns, var, block, selector, footprint, timer)
+
+        with timer.stage('times'):
+            times = read_times(ds, path, len(next(iter(columns.values()))))
+            init_time = read_init_time(ds, path)
+    finally:
+        with timer.stage('close'):
+            ds.close()
+    return _frame(times, columns, init_time, timer)
+
+
+def _extract_cached(path, variables, selector, grid_index, timer, field_cache):
+    """extract_file con los campos de un FieldCache."""
+    cached = field_cache.load(path, variables, timer)
+    with timer.stage('grid'):
+        footprint = grid_index.resolve(cached.geometry, selector, cached.grid, timer)
+    columns = {}
+    for var in variables:
+        with timer.stage('read'):
+            block = cached.fields[var][:, footprint.y, footprint.x]
+        _reduce_columns(columns, var, block, selector, footprint, timer)
+    return _frame(cached.times, columns, cached.init_time, timer)
+
+
+def _reduce_columns(columns, var, block, selector, footprint, timer=NULL_TIMER):
+    with timer.stage('reduce'):
+        values = np.asarray(selector.reduce(block, footprint), dtype=np.float32)
+    _label_columns(columns, var, values, selector)
+
+
+def _label_columns(columns, var, values, selector):
+    """
+    Columnas de la salida de selector.reduce: `var`, o `{var}_{etiqueta}`
+    por region o estacion. Todos los backends nombran asi sus columnas.
+    """
+    if selector.labels is None:
+        columns[var] = values
+    else:
+        for i, label in enumerate(selector.labels):
+            columns[f"{var}_{label}"] = values[:, i]
+
+
+def _frame(times, columns, init_time, timer):
+    with timer.stage('frame'):
+        df = pd.DataFrame({'timestamp': times})
+        for name, values in columns.items():
+            df[name] = values
+        df['init_time'] = init_time
+        df['lead_hour'] = lead_hours(times, init_time)
+    return df
+
+
+def _extract_file_safe(path, variables, selector, instrument=False, field_cache=None):
+    """
+    extract_file que regresa (DataFrame, None, registro) o
+    (None, mensaje de error, registro).
+
+    Se usa tanto en modo serie como en los procesos del pool para que el
+    reporte de errores por archivo sea el mismo en ambos modos. El registro
+    de instrumentacion (ver FileTimer.record) es None si instrument=False.
+    """
+    timer = FileTimer(path) if instrument else NULL_TIMER
+    try:
+        df, error = extract_file(path, variables, selector, timer=timer,
+                                 field_cache=field_cache), None
+    except Exception as e:
+        df, error = None, str(e)
+    return df, error, timer.record(error) if instrument else None
+
+
+def extract_timeseries(wrf_dir, domain='d02', variables=('SWDOWN',), selector=None,
+                       start=None, end=None, tz=None, workers=1, overlap='latest',
+                       backend='netcdf4', instrument=False, inventory=True, field_cache=None):
+    """
+    Extrae series de tiempo de todos los archivos wrfout de un directorio.
+
+    Parametros:
+    wrf_dir (str): Directorio con las salidas del modelo WRF
+    domain (str): Dominio ('d01', 'd02', ...)
+    variables (list): Variables a extraer
+    selector (Selector): Point, BBox, Mask o None (promedio del dominio)
+    start (str, datetime, optional): Inicio de la ventana de tiempo (inclusive)
+    end (str, datetime, optional): Fin de la ventana de tiempo (inclusive)
+    tz (str, optional): Zona horaria IANA de la salida (p. ej.
+        'America/Mexico_City'); None = UTC. start/end se interpretan en ella
+    workers (int): Procesos para leer archivos en paralelo (1 = en serie,
+        None = todos los CPUs disponibles)
+    overlap (str): 'latest' conserva, por tiempo valido, solo el pronostico
+        mas reciente; 'all' conserva todos los ciclos y las columnas
+        init_time y lead_hour
+    backend (str): 'netcdf4' lee archivo por archivo; 'dask' abre todo el
+        directorio como un solo Dataset perezoso (ver lazy.py; `workers` no
+        aplica, el paralelismo lo da el planificador de dask); 'rechunked'
+        lee del almacen fragmentado por series de tiempo (ver rechunk.py),
+        con `wrf_dir` = ruta del almacen
+    instrument (bool, Instrumentation): Mide las etapas de cada archivo e
+        imprime un resumen al final (solo backend 'netcdf4'); se puede pasar
+        un Instrumentation para conservar los registros o escribirlos en JSON
+    inventory (Inventory, bool): Planea las lecturas con el inventario del
+        directorio (por omision): se omiten de antemano los archivos con
+        error y los que no cubren [start, end]; False = glob sin revisar
+        (ver find_wrf_files)
+    field_cache (FieldCache, bool, optional): Con True o un FieldCache (ver
+        field_cache.py) los campos se leen de arreglos .npy locales mapeados
+        en memoria; cada wrfout se decodifica solo la primera vez (solo
+        backend 'netcdf4')
+
+    Regresa:
+    pandas.DataFrame: Serie horaria ordenada por 'timestamp', o None si no
+    se pudo procesar ningun archivo
+    """
+    if backend == 'dask':
+        from .lazy import extract_timeseries_lazy
+        return extract_timeseries_lazy(wrf_dir, domain, variables, selector,
+                                       start, end, tz, overlap, inventory=inventory)
+    if backend == 'rechunked':
+        from .rechunk import extract_rechunked
+        return extract_rechunked(wrf_dir, variables, selector, start, end, tz, overlap)
+    if backend != 'netcdf4':
+        raise ValueError(f"Backend no reconocido: {backend}")
+
+    wrf_files = find_wrf_files(wrf_dir, domain, *utc_window(start, end, tz), inventory)
+    print(f"Existen {len(wrf_files)} archivos de salidas de WRF ")
+
+    instrumentation = None
+    if instrument:
+        instrumentation = instrument if isinstance(instrument, Instrumentation) else Instrumentation()
+
+    all_data = [df for _, df in iter_files(wrf_files, variables, selector, workers,
+                                           instrumentation, field_cache)]
+
+    final_df = None
+    if all_data:
+        with instrumentation.stage('concat') if instrumentation else nullcontext():
+            final_df = finalize_timeseries(pd.concat(all_data, ignore_index=True),
+                                           start, end, tz, overlap)
+    if instrumentation is not None:
+        instrumentation.report()
+    return final_df
+
+
+def finalize_timeseries(df, start=None, end=None, tz=None, overlap='latest'):
+    """
+    Resuelve traslapes, convierte a hora local y recorta a [start, end].
+
+    Parametros:
+    df (pandas.DataFrame): Filas de todos los archivos con 'timestamp' (UTC)
+        'init_time' y 'lead_hour'
+    start, end, tz, overlap: Ver extract_timeseries
+
+    Regresa:
+    pandas.DataFrame: Serie ordenada por 'timestamp'
+    """
+    if overlap == 'latest':
+        df = keep_latest_init(df).drop(columns=['init_time', 'lead_hour'], errors='ignore')
+    else:
+        df = df.sort_values('timestamp', kind='stable', ignore_index=True)
+
+    # La conversion a hora local se hace despues de resolver los traslapes
+    # (en UTC los tiempos validos no se repiten al terminar el horario de verano)
+    if tz is not None:
+        df = localize_times(df, tz)
+
+    if start is not None:
+        df = df[df['timestamp'] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df['timestamp'] <= pd.Timestamp(end)]
+
+    return df.reset_index(drop=True)
+
+
+def iter_files(wrf_files, variables=('SWDOWN',), selector=None, workers=1,
+               instrumentation=None, field_cache=None):
+    """
+    Genera (archivo, DataFrame) para cada archivo procesado, en el orden
+    de wrf_files. Los archivos con error se reportan y se omiten.
+
+    Parametros:
+    wrf_files (list): Rutas de los archivos wrfout
+    variables (list): Variables a extraer
+    selector (Selector): Seleccion espacial (None = promedio del dominio)
+    workers (int): Procesos para leer archivos en paralelo (1 = en serie,
+        None = todos los CPUs disponibles)
+    instrumentation (Instrumentation, optional): Recibe el registro de
+        etapas de cada archivo (tambien de los que fallan)
+    field_cache (FieldCache, bool, optional): Cache de campos (ver
+        extract_timeseries)
+    """
+    instrument = instrumentation is not None
+    if field_cache is True:
+        field_cache = default_field_cache()
+    field_cache = field_cache or None
+    if workers == 1 or len(wrf_files) < 2:
+        for file in wrf_files:
+            result = _extract_file_safe(file, variables, selector, instrument, field_cache)
+            yield from _report(file, result, instrumentation)
+        return
+
+    # Cada archivo se reduce en un proceso. Se mantienen a lo mas 2 tareas
+    # por proceso en vuelo para que la memoria no crezca con el numero de
+    # archivos, y los resultados se entregan en el orden de entrada.
+    max_pending = 2 * (workers or os.cpu_count() or 1)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for file in wrf_files:
+            pending.append((file, pool.submit(_extract_file_safe, file, variables,
+                                              selector, instrument, field_cache)))
+            if len(pending) >= max_pending:
+                done_file, future = pending.popleft()
+                yield from _report(done_file, future.result(), instrumentation)
+        while pending:
+            done_file, future = pending.popleft()
+            yield from _report(done_file, future.result(), instrumentation)
+
+
+def _report(file, result, instrumentation=None):
+    df, error, record = result
+    print(f"Procesando archivo: {os.path.basename(file)}")
+    if instrumentation is not None:
+        instrumentation.add(record)
+    if error is not None:
+        print(f"Error file {file}: {error}")
+        return
+    yield file, df
+
+
+def add_time_columns(df):
+    """
+    Agrega las columnas date, hour, day y month a partir de 'timestamp'.
+
+    'date' es el timestamp truncado al dia (datetime64, no objetos date de
+    Python) y hour/day/month son int8, para no multiplicar el tamanio de
+    series de varios anios.
+    """
+    df['date'] = df['timestamp'].dt.normalize()
+    df['hour'] = df['timestamp'].dt.hour.astype('int8')
+    df['day'] = df['timestamp'].dt.day.astype('int8')
+    df['month'] = df['timestamp'].dt.month.astype('int8')
+    return df
+
+
+def daily_statistics(df, variable='SWDOWN', stats=('mean', 'max', 'min', 'std')):
+    """
+    Estadisticos diarios de una variable agrupando por la columna 'date'.
+
+    Parametros:
+    df (pandas.DataFrame): Serie con columna 'date' (ver add_time_columns)
+    variable (str): Columna a resumir
+    stats (list): Estadisticos de pandas a calcular
+
+    Regresa:
+    pandas.DataFrame: Estadisticos diarios redondeados a 2 decimales
+    """
+    return df.groupby('date').agg({variable: list(stats)}).round(2)
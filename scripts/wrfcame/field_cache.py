@@ -0,0 +1,275 @@
+"""
+Cache local de campos decodificados en arreglos .npy mapeados en memoria.
+
+Los analisis repiten la misma extraccion (SWDOWN/T2 en la ZMVM) cambiando
+solo el area o el mes. Con FieldCache, la primera lectura de cada variable
+de un wrfout guarda el campo completo (Time, south_north, west_east) en
+float32 como <clave>.npy, con un <clave>.json al lado con el archivo de
+origen (tamanio y mtime), los tiempos validos, el inicio del pronostico y
+la geometria de la malla. Las consultas siguientes abren el .npy con
+np.load(mmap_mode='r') y la ventana del selector es una vista de NumPy sin
+copia: solo se leen del disco local las paginas de esa ventana, sin abrir
+el NetCDF.
+
+Cada entrada se invalida si el wrfout cambia (tamanio o mtime). El espacio
+total se limita con `budget_mb`: al agregar entradas se borran las usadas
+hace mas tiempo (el mtime del .json se actualiza en cada acierto), salvo
+las usadas en los ultimos GRACE_S segundos. Cada entrada tiene su propio
+.json y los arreglos se mapean antes de borrar otras entradas; si otro
+proceso borra una entrada que se iba a abrir, el campo se lee de nuevo del
+wrfout. Asi varios procesos pueden usar el mismo cache.
+"""
+import hashlib
+import json
+import os
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .config import cache_dir, is_stale, write_json_atomic
+from .diagnostics import read_fields
+from .grid_index import geometry_key
+from .instrument import NULL_TIMER
+from .reader import open_wrf, read_grid
+from .times import read_init_time, read_times
+
+# Espacio en disco por omision (MB)
+DEFAULT_BUDGET_MB = 4096
+
+# Segundos desde su ultimo uso antes de que una entrada se pueda borrar
+GRACE_S = 60
+
+# Nombre de la entrada con XLAT/XLONG del archivo
+GRID_ENTRY = '_grid'
+
+CachedFields = namedtuple('CachedFields', ['times', 'init_time', 'geometry', 'grid', 'fields'])
+
+
+def _key(path, variable):
+    text = f"{os.path.abspath(path)}:{variable}"
+    return hashlib.sha1(text.encode()).hexdigest()[:20]
+
+
+class FieldCache:
+    """
+    Cache de campos por (archivo wrfout, variable).
+
+    Parametros:
+    root (str, optional): Directorio del cache; por omision
+        <cache_dir>/fields
+    budget_mb (float): Espacio maximo de los .npy en MB
+    grace_s (float): Segundos desde su ultimo uso antes de que una entrada
+        se pueda borrar por espacio
+    """
+
+    def __init__(self, root=None, budget_mb=DEFAULT_BUDGET_MB, grace_s=GRACE_S):
+        self.root = root or os.path.join(cache_dir(), 'fields')
+        self.budget_mb = budget_mb
+        self.grace_s = grace_s
+        os.makedirs(self.root, exist_ok=True)
+
+    def _paths(self, key):
+        base = os.path.join(self.root, key)
+        return f"{base}.npy", f"{base}.json"
+
+    def _entry(self, path, variable, st):
+        """Metadatos de la entrada si existe y el archivo no ha cambiado."""
+        npy, meta = self._paths(_key(path, variable))
+        try:
+            with open(meta) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if is_stale(entry, path, st) or not os.path.exists(npy):
+            return None
+        return entry
+
+    def _touch(self, variable_key):
+        _, meta = self._paths(variable_key)
+        try:
+            os.utime(meta)
+        except OSError:
+            pass
+
+    def _store(self, path, variable, st, array, header):
+        """Escribe una entrada (reemplazo atomico: .npy primero, luego .json)."""
+        npy, meta = self._paths(_key(path, variable))
+        tmp = f"{npy}.{os.getpid()}.tmp.npy"
+        np.save(tmp, array)
+        os.replace(tmp, npy)
+        entry = {'source': os.path.abspath(path), 'variable': variable,
+                 'size': st.st_size, 'mtime': st.st_mtime, **header}
+        write_json_atomic(meta, entry)
+        return entry
+
+    def load(self, path, variables, timer=NULL_TIMER):
+        """
+        Campos de un wrfout, del cache o leyendolos (y guardandolos) una vez.
+
+        El wrfout solo se abre si falta alguna entrada, y entonces se leen
+        todas las que faltan en una sola apertura. Las entradas del cache se
+        abren antes de borrar otras por espacio (un arreglo ya mapeado sigue
+        siendo valido aunque otro proceso borre su archivo), y si otro
+        proceso borra una entrada entre la revision y la apertura, el campo
+        se vuelve a leer del wrfout.
+
+        Parametros:
+        path (str): Ruta del archivo wrfout
+        variables (list): Variables del wrfout y/o diagnosticos (ver
+            diagnostics.DIAGNOSTICS) con resultado (Time, y, x)
+        timer (FileTimer, optional): Registra las etapas open/read/close y
+            los bytes leidos del wrfout
+
+        Regresa:
+        CachedFields: times (datetime64[ns]), init_time (Timestamp),
+        geometry (clave de malla o None), grid (funcion que regresa
+        (lats, lons)) y fields ({variable: arreglo mapeado en memoria o, si
+        se acaba de leer, en memoria})
+        """
+        st = os.stat(path)
+        names = [GRID_ENTRY] + list(dict.fromkeys(variables))
+        header = None
+        arrays = {}
+        for name in names:
+            entry = self._entry(path, name, st)
+            if entry is None:
+                continue
+            key = _key(path, name)
+            try:
+                arrays[name] = np.load(self._paths(key)[0], mmap_mode='r')
+            except (OSError, ValueError):
+                # Borrada o reemplazada por otro proceso
+                continue
+            self._touch(key)
+            header = entry
+        missing = [name for name in names if name not in arrays]
+
+        if missing:
+            header, read = self._read(path, missing, timer)
+            for name, array in read.items():
+                self._store(path, name, st, array, header)
+            arrays.update(read)
+            self.evict(keep={_key(path, name) for name in names})
+
+        grid = arrays.pop(GRID_ENTRY)
+        times = np.asarray(header['times'], dtype='datetime64[s]').astype('datetime64[ns]')
+        return CachedFields(times, pd.Timestamp(header['init_time']), header['geometry'],
+                            lambda: (grid[0], grid[1]), arrays)
+
+    def _read(self, path, names, timer):
+        """Lee del wrfout los campos `names` (y la malla) y los metadatos."""
+        header = {}
+        arrays = {}
+        with timer.stage('open'):
+            ds = open_wrf(path)
+        try:
+            with timer.stage('times'):
+                n_times = len(ds.dimensions['Time'])
+                times = read_times(ds, path, n_times)
+                header['times'] = times.astype('datetime64[s]').astype(np.int64).tolist()
+                header['init_time'] = read_init_time(ds, path).isoformat()
+            try:
+                header['geometry'] = geometry_key(ds)
+            except KeyError:
+                header['geometry'] = None
+            if GRID_ENTRY in names:
+                with timer.stage('read'):
+                    arrays[GRID_ENTRY] = np.stack(read_grid(ds)).astype(np.float32)
+            fields = [name for name in names if name != GRID_ENTRY]
+            for name, block in read_fields(ds, fields, timer=timer):
+                if block.ndim != 3:
+                    raise ValueError(f"{name} no es un campo 2D por tiempo")
+                arrays[name] = np.ascontiguousarray(block, dtype=np.float32)
+        finally:
+            with timer.stage('close'):
+                ds.close()
+        return header, arrays
+
+    def entries(self):
+        """
+        Entradas del cache.
+
+        Regresa:
+        pandas.DataFrame: source, variable, nbytes y last_used por entrada,
+        de la usada hace mas tiempo a la mas reciente
+        """
+        rows = []
+        for name in os.listdir(self.root):
+            if not name.endswith('.json'):
+                continue
+            key = name[:-len('.json')]
+            npy, meta = self._paths(key)
+            try:
+                with open(meta) as f:
+                    entry = json.load(f)
+                rows.append({'key': key, 'source': entry['source'], 'variable': entry['variable'],
+                             'nbytes': os.path.getsize(npy), 'last_used': os.path.getmtime(meta)})
+            except (OSError, ValueError):
+                continue
+        df = pd.DataFrame(rows, columns=['key', 'source', 'variable', 'nbytes', 'last_used'])
+        df['last_used'] = pd.to_datetime(df['last_used'], unit='s')
+        return df.sort_values('last_used', ignore_index=True)
+
+    def remove(self, key):
+        for file in self._paths(key):
+            try:
+                os.remove(file)
+            except FileNotFoundError:
+                pass
+
+    def evict(self, keep=()):
+        """
+        Borra las entradas usadas hace mas tiempo hasta quedar en budget_mb.
+
+        Las entradas usadas en los ultimos grace_s segundos no se borran
+        (las acaba de escribir o abrir otro proceso), asi que con varios
+        procesos el cache puede pasar un poco de budget_mb.
+
+        Parametros:
+        keep (set): Claves que no se borran (las de la consulta en curso)
+
+        Regresa:
+        int: Numero de entradas borradas
+        """
+        df = self.entries()
+        excess = df['nbytes'].sum() - self.budget_mb * 2 ** 20
+        recent = pd.Timestamp(time.time() - self.grace_s, unit='s')
+        removed = 0
+        for row in df.itertuples():
+            if excess <= 0 or row.last_used >= recent:
+                break
+            if row.key in keep:
+                continue
+            self.remove(row.key)
+            excess -= row.nbytes
+            removed += 1
+        return removed
+
+    def purge(self):
+        """
+        Borra las entradas cuyo wrfout ya no existe o cambio.
+
+        Regresa:
+        int: Numero de entradas borradas
+        """
+        removed = 0
+        for row in self.entries().itertuples():
+            try:
+                st = os.stat(row.source)
+            except FileNotFoundError:
+                st = None
+            if st is None or self._entry(row.source, row.variable, st) is None:
+                self.remove(row.key)
+                removed += 1
+        return removed
+
+
+@lru_cache(maxsize=None)
+def default_field_cache():
+    """
+    Cache compartido del proceso en <cache_dir>/fields.
+    """
+    return FieldCache()
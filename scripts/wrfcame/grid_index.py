@@ -0,0 +1,223 @@
+"""
+Indice persistente de celdas de malla por region.
+
+La malla d02 no cambia entre pronosticos, asi que la ventana (y0:y1, x0:x1)
+y la lista de celdas de cada region se calculan una sola vez por geometria
+de dominio y se guardan en un archivo JSON. Las extracciones siguientes
+leen la ventana directamente sin volver a leer XLAT/XLONG ni construir la
+mascara lat/lon sobre toda la malla.
+
+La geometria se identifica con los atributos globales que WRF escribe
+igual en geo_em.d0X.nc y en wrfout_d0X_*.nc (los mismos parametros de
+&geogrid en namelist.wps).
+"""
+import hashlib
+import os
+from functools import lru_cache
+
+import numpy as np
+from scipy import sparse
+
+from .config import cache_dir, read_json, write_json_atomic
+from .instrument import NULL_TIMER
+from .reader import read_grid
+from .selectors import BBox, Footprint
+
+# Regiones con nombre usadas en los scripts
+REGIONS = {
+    # Area CAMe de las series SWDOWN_operativo_WRF_4.2.1
+    'came': BBox(lat_bounds=(19.3, 19.75), lon_bounds=(-99.26, -98.88)),
+    # Area de time_series_wrf_zmvm.py / zmvm_swdown.py
+    'zmvm': BBox(lat_bounds=(19.18, 19.45), lon_bounds=(-99.15, -98.52)),
+}
+
+# Atributos globales que definen la geometria de la malla
+GEOMETRY_ATTRS = (
+    'MAP_PROJ', 'WEST-EAST_GRID_DIMENSION', 'SOUTH-NORTH_GRID_DIMENSION',
+    'DX', 'DY', 'CEN_LAT', 'CEN_LON', 'TRUELAT1', 'TRUELAT2',
+    'MOAD_CEN_LAT', 'STAND_LON',
+)
+
+
+def region(name):
+    """
+    Selector de una region con nombre (ver REGIONS).
+    """
+    try:
+        return REGIONS[name]
+    except KeyError:
+        raise KeyError(f"Region desconocida: {name}. Opciones: {sorted(REGIONS)}")
+
+
+def geometry_key(ds):
+    """
+    Clave de la geometria de malla a partir de los atributos globales.
+
+    Parametros:
+    ds (netCDF4.Dataset): wrfout o geo_em abierto
+
+    Regresa:
+    str: Hash corto de los atributos de GEOMETRY_ATTRS
+    """
+    attrs = set(ds.ncattrs())
+    missing = [name for name in GEOMETRY_ATTRS if name not in attrs]
+    if missing:
+        raise KeyError(f"Atributos de geometria no encontrados: {missing}")
+    values = [round(float(ds.getncattr(name)), 4) for name in GEOMETRY_ATTRS]
+    return hashlib.sha1(repr(values).encode()).hexdigest()[:16]
+
+
+def _entry_from_footprint(footprint, shape):
+    """
+    Entrada JSON de una ventana; 'cells' solo se guarda si la region no
+    cubre toda la ventana, 'points' solo para selectores de varios puntos y
+    'weights' (celdas absolutas y pesos por region) solo para poligonos.
+    """
+    y = range(*footprint.y.indices(shape[0]))
+    x = range(*footprint.x.indices(shape[1]))
+    entry = {'y': [y.start, y.stop], 'x': [x.start, x.stop]}
+    if footprint.mask is not None:
+        jj, ii = np.nonzero(footprint.mask)
+        entry['cells'] = np.column_stack([jj + y.start, ii + x.start]).tolist()
+    if footprint.cells is not None:
+        entry['points'] = (footprint.cells + [y.start, x.start]).tolist()
+    if footprint.weights is not None:
+        coo = footprint.weights.tocoo()
+        jj, ii = np.divmod(coo.col, len(x))
+        entry['weights'] = {
+            'regions': int(coo.shape[0]),
+            'rows': coo.row.tolist(),
+            'cells': np.column_stack([jj + y.start, ii + x.start]).tolist(),
+            'data': coo.data.tolist(),
+        }
+    return entry
+
+
+def _footprint_from_entry(entry):
+    y0, y1 = entry['y']
+    x0, x1 = entry['x']
+    mask = None
+    if 'cells' in entry:
+        cells = np.asarray(entry['cells'], dtype=int).reshape(-1, 2)
+        mask = np.zeros((y1 - y0, x1 - x0), dtype=bool)
+        mask[cells[:, 0] - y0, cells[:, 1] - x0] = True
+    points = None
+    if 'points' in entry:
+        points = np.asarray(entry['points'], dtype=int).reshape(-1, 2) - [y0, x0]
+    weights = None
+    if 'weights' in entry:
+        w = entry['weights']
+        cells = np.asarray(w['cells'], dtype=int).reshape(-1, 2)
+        cols = (cells[:, 0] - y0) * (x1 - x0) + (cells[:, 1] - x0)
+        weights = sparse.csr_matrix((w['data'], (w['rows'], cols)),
+                                    shape=(w['regions'], (y1 - y0) * (x1 - x0)))
+    return Footprint(slice(y0, y1), slice(x0, x1), mask, points, weights)
+
+
+class GridIndex:
+    """
+    Cache de ventanas de lectura por geometria de malla y selector.
+
+    Parametros:
+    path (str, optional): Archivo JSON del indice; None = solo en memoria
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._data = read_json(path, {})
+
+    def footprint(self, ds, selector, timer=NULL_TIMER):
+        """
+        Ventana de lectura del selector en la malla de `ds`.
+
+        Si el selector no tiene clave de cache (cache_key() es None) se
+        resuelve directamente sobre XLAT/XLONG.
+
+        Parametros:
+        ds (netCDF4.Dataset): wrfout abierto con open_wrf
+        selector (Selector): Seleccion espacial
+        timer (FileTimer, optional): Registra el acierto o fallo del indice
+
+        Regresa:
+        Footprint: Ventana de lectura
+        """
+        if selector.cache_key() is None:
+            timer.cache(False)
+            return selector.locate(*read_grid(ds))
+        return self.resolve(geometry_key(ds), selector, lambda: read_grid(ds), timer)
+
+    def resolve(self, geometry, selector, load_grid, timer=NULL_TIMER):
+        """
+        Ventana de lectura del selector en una malla ya identificada.
+
+        Parametros:
+        geometry (str): Clave de la malla (ver geometry_key); None = sin
+            cache
+        selector (Selector): Seleccion espacial
+        load_grid (callable): Regresa (lats, lons); solo se llama si la
+            ventana no esta en el indice
+        timer (FileTimer, optional): Registra el acierto o fallo del indice
+
+        Regresa:
+        Footprint: Ventana de lectura
+        """
+        key = selector.cache_key()
+        if key is None or geometry is None:
+            timer.cache(False)
+            return selector.locate(*load_grid())
+
+        regions = self._data.setdefault(geometry, {})
+        timer.cache(key in regions)
+        if key in regions:
+            return _footprint_from_entry(regions[key])
+
+        lats, lons = load_grid()
+        footprint = selector.locate(lats, lons)
+        regions[key] = _entry_from_footprint(footprint, lats.shape)
+        self.save()
+        return footprint
+
+    def build(self, geo_em_path, regions=None):
+        """
+        Precalcula las regiones con nombre a partir de un geo_em.d0X.nc.
+
+        Parametros:
+        geo_em_path (str): Ruta de geo_em.d0X.nc
+        regions (dict, optional): {nombre: selector}; por omision REGIONS
+        """
+        import netCDF4 as nc
+
+        regions = REGIONS if regions is None else regions
+        ds = nc.Dataset(geo_em_path, 'r')
+        try:
+            lats = ds.variables['XLAT_M'][0]
+            lons = ds.variables['XLONG_M'][0]
+            entries = self._data.setdefault(geometry_key(ds), {})
+            for name, selector in regions.items():
+                footprint = selector.locate(lats, lons)
+                entries[selector.cache_key()] = _entry_from_footprint(footprint, lats.shape)
+                print(f"Region {name}: y={footprint.y}, x={footprint.x}")
+        finally:
+            ds.close()
+        self.save()
+
+    def save(self):
+        """
+        Escribe el indice en disco (reemplazo atomico del archivo JSON).
+        """
+        if self.path is not None:
+            write_json_atomic(self.path, self._data)
+
+
+@lru_cache(maxsize=None)
+def default_grid_index():
+    """
+    Indice compartido del proceso en <cache_dir>/grid_index.json.
+    """
+    return GridIndex(os.path.join(cache_dir(), 'grid_index.json'))
+
+
+if __name__ == "__main__":
+    # Precalcula las regiones CAMe y ZMVM para el dominio operativo d02
+    geo_em = "../namelists_operativo_wrf4_2024/geo_em.d02.nc"
+    default_grid_index().build(geo_em)
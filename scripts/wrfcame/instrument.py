@@ -0,0 +1,174 @@
+"""
+Instrumentacion opcional del ciclo de extraccion.
+
+Con instrument=True (extract_timeseries, iter_files) o --instrument en la
+linea de comandos, cada archivo registra la duracion de sus etapas, los
+bytes leidos y los aciertos/fallos del indice de malla. Al final se
+imprime una tabla por etapa y, si se pide, se escribe un registro JSON por
+archivo. Asi se distingue si una corrida lenta en Lustre se va en abrir y
+leer (sistema de archivos) o en reducir y armar las tablas (codigo).
+
+Etapas por archivo:
+    open    abrir el wrfout (metadatos)
+    grid    ventana del selector (indice de malla o XLAT/XLONG)
+    read    leer las variables en la ventana
+    derive  calcular diagnosticos
+    reduce  reducir la ventana (promedio, mascara, estaciones)
+    times   decodificar tiempos validos e init_time
+    frame   armar el DataFrame del archivo
+    close   cerrar el archivo
+Etapa global:
+    concat  unir archivos, resolver traslapes y recortar
+"""
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+FILE_STAGES = ('open', 'grid', 'read', 'derive', 'reduce', 'times', 'frame', 'close')
+
+
+class FileTimer:
+    """
+    Mediciones de un archivo.
+
+    Parametros:
+    path (str): Ruta del archivo wrfout
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.stages = {}
+        self.bytes_read = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @contextmanager
+    def stage(self, name):
+        """Acumula la duracion del bloque `with` en la etapa `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def add_read(self, nbytes):
+        self.bytes_read += int(nbytes)
+
+    def cache(self, hit):
+        if hit:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+
+    def record(self, error=None):
+        """Registro del archivo como diccionario (serializable a JSON)."""
+        return {
+            'file': self.path,
+            'stages_s': dict(self.stages),
+            'bytes_read': self.bytes_read,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'error': error,
+        }
+
+
+class NullTimer:
+    """FileTimer que no mide nada (instrumentacion apagada)."""
+
+    def stage(self, name):
+        return nullcontext()
+
+    def add_read(self, nbytes):
+        pass
+
+    def cache(self, hit):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+class Instrumentation:
+    """
+    Junta los registros por archivo y las etapas globales de una corrida.
+
+    Parametros:
+    log_path (str, optional): Archivo JSON Lines donde se escribe un
+        registro por archivo conforme se procesan
+    """
+
+    def __init__(self, log_path=None):
+        self.records = []
+        self.stages = {}
+        self.log_path = log_path
+        if log_path is not None:
+            # Se trunca al inicio de la corrida
+            open(log_path, 'w').close()
+
+    def add(self, record):
+        """Agrega el registro de un archivo (ver FileTimer.record)."""
+        self.records.append(record)
+        if self.log_path is not None:
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+
+    @contextmanager
+    def stage(self, name):
+        """Mide una etapa global (p. ej. concat)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def files_table(self):
+        """
+        Tabla por archivo: una columna por etapa (s), bytes y cache.
+        """
+        rows = []
+        for record in self.records:
+            row = {'file': os.path.basename(record['file'])}
+            row.update(record['stages_s'])
+            row.update({k: record[k] for k in ('bytes_read', 'cache_hits', 'cache_misses', 'error')})
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def summary(self):
+        """
+        Tabla por etapa: tiempo total, promedio y maximo por archivo, y
+        porcentaje del total.
+        """
+        files = self.files_table()
+        rows = {}
+        for stage in FILE_STAGES:
+            if stage in files.columns:
+                values = files[stage].fillna(0.0)
+                rows[stage] = {'total_s': values.sum(), 'mean_s': values.mean(),
+                               'max_s': values.max()}
+        for stage, seconds in self.stages.items():
+            rows[stage] = {'total_s': seconds, 'mean_s': seconds, 'max_s': seconds}
+        table = pd.DataFrame.from_dict(rows, orient='index', columns=['total_s', 'mean_s', 'max_s'])
+        total = table['total_s'].sum()
+        table['percent'] = 100 * table['total_s'] / total if total > 0 else 0.0
+        return table
+
+    def report(self):
+        """Imprime el resumen por etapa, los bytes leidos y el indice de malla."""
+        files = self.files_table()
+        if files.empty:
+            print("Instrumentacion: no se proceso ningun archivo")
+            return
+        summary = self.summary()
+        read_s = summary['total_s'].get('read', 0.0)
+        mb = files['bytes_read'].sum() / 2 ** 20
+        errors = int(files['error'].notna().sum())
+        print("\nTiempo por etapa:")
+        print(summary.round(4).to_string())
+        print(f"Archivos: {len(files)} ({errors} con error)")
+        print(f"Leido: {mb:.1f} MB en {read_s:.3f} s"
+              + (f" ({mb / read_s:.1f} MB/s)" if read_s > 0 else ''))
+        print(f"Indice de malla: {int(files['cache_hits'].sum())} aciertos, "
+              f"{int(files['cache_misses'].sum())} fallos")
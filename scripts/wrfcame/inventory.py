@@ -0,0 +1,288 @@
+"""
+Inventario de los wrfout de los directorios Salidas_WRF_* con su integridad.
+
+En lugar de listar los archivos con glob en cada corrida y descubrir un
+archivo truncado o corrupto hasta que falla la lectura, el inventario
+revisa una sola vez cada wrfout (dominio, inicio del pronostico, numero de
+tiempos, primer y ultimo tiempo valido, tamanio y si el encabezado y el
+ultimo tiempo se pueden leer) y lo guarda en <cache_dir>/inventory.json.
+Refrescarlo solo revisa los archivos nuevos o modificados.
+
+Los extractores (find_wrf_files, extract_timeseries, extract_incremental
+y `extract` en la linea de comandos) planean por omision sus lecturas con
+el inventario (inventory=False o --no-inventory lo desactivan): solo
+los archivos validos cuyos tiempos cubren la ventana pedida, y los huecos
+en la cobertura se reportan antes de leer:
+
+    inventory = default_inventory()
+    inventory.refresh(['/LUSTRE/ID/hidromet/WRF/Salidas_WRF_*'], workers=8)
+    inventory.bad_files()
+    inventory.gaps(domain='d02')
+"""
+import glob
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .config import cache_dir, is_stale, read_json, write_json_atomic
+from .reader import open_wrf
+from .times import read_init_time, read_times
+
+FILE_PATTERN = 'wrfout_d[0-9][0-9]_*.nc'
+DOMAIN_PATTERN = re.compile(r'wrfout_(d\d\d)_')
+
+COLUMNS = ['path', 'directory', 'domain', 'init_time', 'n_times', 'first_time', 'last_time',
+           'interval_s', 'size', 'mtime', 'valid', 'error']
+
+
+def inspect_file(path):
+    """
+    Revisa un wrfout: metadatos de tiempo e integridad.
+
+    Un archivo es valido si se abre, sus tiempos (Times/XTIME) se
+    decodifican y crecen, y se puede leer el ultimo tiempo de su ultima
+    variable (un archivo truncado falla en esa lectura).
+
+    Parametros:
+    path (str): Ruta del archivo wrfout
+
+    Regresa:
+    dict: Registro con las columnas de COLUMNS (menos path y directory)
+    """
+    st = os.stat(path)
+    match = DOMAIN_PATTERN.search(os.path.basename(path))
+    record = {
+        'domain': match.group(1) if match else None,
+        'init_time': None,
+        'n_times': 0,
+        'first_time': None,
+        'last_time': None,
+        'interval_s': None,
+        'size': st.st_size,
+        'mtime': st.st_mtime,
+        'valid': False,
+        'error': None,
+    }
+    try:
+        ds = open_wrf(path)
+        try:
+            n_times = len(ds.dimensions['Time'])
+            times = read_times(ds, path, n_times)
+            record['init_time'] = read_init_time(ds, path).isoformat()
+            record['n_times'] = n_times
+            if n_times == 0:
+                raise ValueError("El archivo no tiene tiempos")
+            record['first_time'] = pd.Timestamp(times[0]).isoformat()
+            record['last_time'] = pd.Timestamp(times[-1]).isoformat()
+            steps = np.diff(times).astype('timedelta64[s]').astype(np.int64)
+            if n_times > 1:
+                if (steps <= 0).any():
+                    raise ValueError("Los tiempos del archivo no son crecientes")
+                record['interval_s'] = int(np.median(steps))
+
+            records = [v for v in ds.variables.values() if v.dimensions[:1] == ('Time',)]
+            if records:
+                last = records[-1]
+                last[(n_times - 1,) + (0,) * (last.ndim - 1)]
+        finally:
+            ds.close()
+        record['valid'] = True
+    except Exception as e:
+        record['error'] = str(e)
+    return record
+
+
+class Inventory:
+    """
+    Inventario persistente de archivos wrfout.
+
+    Parametros:
+    path (str, optional): Archivo JSON del inventario; None = solo en memoria
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._data = read_json(path, {})
+
+    def is_stale(self, path):
+        """True si el archivo no esta en el inventario o cambio desde entonces."""
+        return is_stale(self._data.get(os.path.abspath(path)), path)
+
+    def refresh(self, directories, workers=1):
+        """
+        Revisa los wrfout nuevos o modificados de uno o varios directorios.
+
+        Los archivos que ya no existen en esos directorios se quitan.
+
+        Parametros:
+        directories (str, list): Directorios o patrones glob
+            (p. ej. '/LUSTRE/.../Salidas_WRF_*')
+        workers (int): Procesos para revisar archivos en paralelo (1 = en
+            serie, None = todos los CPUs disponibles)
+
+        Regresa:
+        int: Numero de archivos revisados en esta llamada
+        """
+        if isinstance(directories, str):
+            directories = [directories]
+        found = set()
+        scanned = set()
+        for pattern in directories:
+            for directory in sorted(glob.glob(pattern)) or [pattern]:
+                directory = os.path.abspath(directory)
+                scanned.add(directory)
+                found.update(os.path.abspath(f)
+                             for f in glob.glob(os.path.join(directory, FILE_PATTERN)))
+
+        for path in [p for p in self._data if os.path.dirname(p) in scanned and p not in found]:
+            del self._data[path]
+
+        return self._inspect(found, workers)
+
+    def _inspect(self, paths, workers=1):
+        """Revisa los archivos de `paths` nuevos o modificados y guarda."""
+        pending = sorted(f for f in paths if self.is_stale(f))
+        if workers == 1 or len(pending) < 2:
+            records = map(inspect_file, pending)
+            self._data.update(zip(pending, records))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                self._data.update(zip(pending, pool.map(inspect_file, pending, chunksize=8)))
+        self.save()
+        return len(pending)
+
+    def check(self, paths, workers=1):
+        """
+        Revisa una lista de archivos (los nuevos o modificados) y regresa
+        los validos.
+
+        Los archivos con error se reportan y se omiten, como en plan.
+
+        Parametros:
+        paths (list): Rutas de archivos wrfout
+        workers (int): Procesos para revisar archivos en paralelo
+
+        Regresa:
+        list: Rutas validas, en el orden de `paths`
+        """
+        self._inspect({os.path.abspath(p) for p in paths}, workers)
+        valid = []
+        for path in paths:
+            entry = self._data[os.path.abspath(path)]
+            if entry['valid']:
+                valid.append(path)
+            else:
+                print(f"Omitiendo archivo con error {os.path.basename(path)}: {entry['error']}")
+        return valid
+
+    def files(self, directory=None, domain=None):
+        """
+        Archivos del inventario.
+
+        Parametros:
+        directory (str, optional): Solo los de este directorio
+        domain (str, optional): Solo los de este dominio
+
+        Regresa:
+        pandas.DataFrame: Una fila por archivo con COLUMNS, ordenada por
+        dominio, init_time y ruta
+        """
+        rows = [{'path': path, 'directory': os.path.dirname(path), **entry}
+                for path, entry in self._data.items()]
+        df = pd.DataFrame(rows, columns=COLUMNS)
+        if directory is not None:
+            df = df[df['directory'] == os.path.abspath(directory)]
+        if domain is not None:
+            df = df[df['domain'] == domain]
+        for column in ('init_time', 'first_time', 'last_time'):
+            df[column] = pd.to_datetime(df[column])
+        df['n_times'] = df['n_times'].astype('int32')
+        df['valid'] = df['valid'].astype(bool)
+        return df.sort_values(['domain', 'init_time', 'path'], ignore_index=True)
+
+    def bad_files(self, directory=None, domain=None):
+        """Archivos que no pasaron la revision, con el error."""
+        df = self.files(directory, domain)
+        return df.loc[~df['valid'], ['path', 'size', 'error']].reset_index(drop=True)
+
+    def plan(self, directory, domain='d02', start=None, end=None):
+        """
+        Archivos validos que hay que leer para la ventana [start, end].
+
+        Parametros:
+        directory (str): Directorio con las salidas del modelo WRF
+        domain (str): Dominio
+        start (str, datetime, optional): Primer tiempo valido (inclusive)
+        end (str, datetime, optional): Ultimo tiempo valido (inclusive)
+
+        Regresa:
+        list: Rutas ordenadas por inicio del pronostico
+        """
+        df = self.files(directory, domain)
+        bad = df[~df['valid']]
+        for row in bad.itertuples():
+            print(f"Omitiendo archivo con error {os.path.basename(row.path)}: {row.error}")
+        df = df[df['valid']]
+        if start is not None:
+            df = df[df['last_time'] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df['first_time'] <= pd.Timestamp(end)]
+        return df['path'].tolist()
+
+    def gaps(self, directory=None, domain='d02', start=None, end=None):
+        """
+        Huecos en la cobertura de tiempos validos de los archivos validos.
+
+        La cobertura de cada archivo es [first_time, last_time] con su
+        intervalo de salida; hay hueco donde ningun archivo cubre un tiempo
+        entre el primero y el ultimo del inventario (o en [start, end]).
+
+        Parametros:
+        directory (str, optional): Solo los archivos de este directorio
+        domain (str): Dominio
+        start, end (str, datetime, optional): Ventana a revisar
+
+        Regresa:
+        pandas.DataFrame: Columnas start, end (primer y ultimo tiempo
+        faltante) y missing (numero de tiempos faltantes)
+        """
+        df = self.files(directory, domain)
+        df = df[df['valid']].sort_values('first_time', ignore_index=True)
+        if df.empty:
+            return pd.DataFrame(columns=['start', 'end', 'missing'])
+        step = pd.Timedelta(seconds=int(df['interval_s'].dropna().median())
+                            if df['interval_s'].notna().any() else 3600)
+
+        # Fin de la cobertura acumulada antes de cada archivo
+        covered = df['last_time'].cummax().shift()
+        bounds = pd.DataFrame({'start': covered + step, 'end': df['first_time'] - step})
+        if start is not None and pd.Timestamp(start) < df['first_time'].iloc[0]:
+            bounds.loc[-1] = [pd.Timestamp(start), df['first_time'].iloc[0] - step]
+        if end is not None and pd.Timestamp(end) > df['last_time'].max():
+            bounds.loc[len(df)] = [df['last_time'].max() + step, pd.Timestamp(end)]
+        if start is not None:
+            bounds['start'] = bounds['start'].clip(lower=pd.Timestamp(start))
+        if end is not None:
+            bounds['end'] = bounds['end'].clip(upper=pd.Timestamp(end))
+        gaps = bounds[bounds['end'] >= bounds['start']].sort_values('start', ignore_index=True)
+        gaps['missing'] = ((gaps['end'] - gaps['start']) // step + 1).astype('int64')
+        return gaps
+
+    def save(self):
+        """
+        Escribe el inventario en disco (reemplazo atomico del archivo JSON).
+        """
+        if self.path is not None:
+            write_json_atomic(self.path, self._data)
+
+
+@lru_cache(maxsize=None)
+def default_inventory():
+    """
+    Inventario compartido del proceso en <cache_dir>/inventory.json.
+    """
+    return Inventory(os.path.join(cache_dir(), 'inventory.json'))
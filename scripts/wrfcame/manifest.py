@@ -0,0 +1,112 @@
+"""
+Extraccion incremental: solo se procesan los wrfout nuevos o modificados.
+
+Cada almacen Parquet (ver store.py) lleva un manifiesto _manifest.json con
+los archivos ya procesados por region (ruta, tamanio, mtime, dominio,
+fecha de inicio del pronostico y archivos Parquet escritos). Con un nuevo
+pronostico diario, el post-proceso solo lee los archivos que faltan.
+"""
+import os
+
+from .config import is_stale, read_json, write_json_atomic
+from .engine import find_wrf_files, iter_files
+from .selectors import DomainMean
+from .store import append_to_store
+
+MANIFEST_NAME = '_manifest.json'
+
+
+class Manifest:
+    """
+    Registro de los wrfout procesados en un almacen.
+
+    Parametros:
+    root (str): Directorio raiz del almacen Parquet
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.path = os.path.join(root, MANIFEST_NAME)
+        self._data = read_json(self.path, {})
+
+    def entry(self, region, path):
+        """Registro de un archivo en una region, o None."""
+        return self._data.get(region, {}).get(os.path.abspath(path))
+
+    def is_stale(self, region, path, variables):
+        """
+        True si el archivo no se ha procesado o cambio desde entonces.
+        """
+        entry = self.entry(region, path)
+        return is_stale(entry, path) or entry['variables'] != list(variables)
+
+    def record(self, region, path, domain, variables, parts, init_time):
+        """
+        Registra un archivo procesado y los Parquet que genero.
+        """
+        st = os.stat(path)
+        self._data.setdefault(region, {})[os.path.abspath(path)] = {
+            'size': st.st_size,
+            'mtime': st.st_mtime,
+            'domain': domain,
+            'init_time': init_time.isoformat(),
+            'variables': list(variables),
+            'parts': [os.path.relpath(p, self.root) for p in parts],
+        }
+
+    def remove_parts(self, region, path):
+        """
+        Borra los Parquet escritos antes para un archivo (si cambio).
+        """
+        entry = self.entry(region, path)
+        if entry is None:
+            return
+        for part in entry['parts']:
+            part_path = os.path.join(self.root, part)
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+    def save(self):
+        """Escribe el manifiesto (reemplazo atomico)."""
+        write_json_atomic(self.path, self._data, indent=1)
+
+
+def extract_incremental(wrf_dir, store_root, region, selector=None, domain='d02',
+                        variables=('SWDOWN',), workers=1, inventory=True):
+    """
+    Extrae solo los wrfout nuevos o modificados y los agrega al almacen.
+
+    Parametros:
+    wrf_dir (str): Directorio con las salidas del modelo WRF
+    store_root (str): Directorio raiz del almacen Parquet
+    region (str): Nombre de la region en el almacen
+    selector (Selector): Seleccion espacial (None = promedio del dominio);
+        selector.describe() se guarda en _regions.json del almacen
+    domain (str): Dominio ('d01', 'd02', ...)
+    variables (list): Variables a extraer
+    workers (int): Procesos para leer archivos en paralelo
+    inventory (Inventory, bool): Omite de antemano los archivos con error
+        del inventario del directorio; False = glob sin revisar (ver
+        find_wrf_files)
+
+    Regresa:
+    int: Numero de archivos procesados en esta corrida
+    """
+    selector = selector or DomainMean()
+    manifest = Manifest(store_root)
+    wrf_files = find_wrf_files(wrf_dir, domain, inventory=inventory)
+    pending = [f for f in wrf_files if manifest.is_stale(region, f, variables)]
+    print(f"Existen {len(wrf_files)} archivos de salidas de WRF, "
+          f"{len(pending)} nuevos o modificados")
+
+    processed = 0
+    for file, df in iter_files(pending, variables, selector, workers):
+        manifest.remove_parts(region, file)
+        stem = os.path.splitext(os.path.basename(file))[0]
+        parts = append_to_store(df, store_root, domain, region, basename=stem,
+                                attrs=selector.describe())
+        manifest.record(region, file, domain, variables, parts, df['init_time'].iloc[0])
+        # Se guarda por archivo para no perder avance si la corrida se interrumpe
+        manifest.save()
+        processed += 1
+    return processed
@@ -0,0 +1,176 @@
+"""
+Promedios sobre poligonos arbitrarios (alcaldias, municipios, estados).
+
+Cada poligono se rasteriza una sola vez sobre la malla del dominio: para
+cada celda se calcula la fraccion de su area que cae dentro del poligono
+(celdas construidas con las esquinas entre centros XLAT/XLONG, en
+coordenadas Mercator). Los pesos de todas las regiones se guardan como una
+matriz dispersa (regiones x celdas) en el indice de malla, y el promedio de
+decenas de regiones es un solo producto matriz-vector disperso por tiempo.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import shapely
+from scipy import sparse
+from shapely.geometry import shape
+
+from .selectors import Footprint, Selector
+from .stations import mercator
+
+
+def load_polygons(path, name_field, where=None):
+    """
+    Lee poligonos de un GeoJSON o de un shapefile.
+
+    Para los estados de Natural Earth (como en wrf-dominios.py) la ruta se
+    obtiene con cartopy.io.shapereader.natural_earth(resolution='10m',
+    category='cultural', name='admin_1_states_provinces').
+
+    Parametros:
+    path (str): Archivo .geojson/.json o .shp (coordenadas lon/lat)
+    name_field (str): Atributo con el nombre de cada poligono
+    where (dict, optional): {atributo: valor} que deben cumplir los
+        registros (p. ej. {'admin': 'Mexico'})
+
+    Regresa:
+    dict: {nombre: geometria de shapely}
+    """
+    if path.endswith('.shp'):
+        import shapefile
+        with shapefile.Reader(path) as reader:
+            features = [
+                {'properties': record.as_dict(), 'geometry': geom.__geo_interface__}
+                for record, geom in zip(reader.iterRecords(), reader.iterShapes())
+            ]
+    else:
+        with open(path) as f:
+            features = json.load(f)['features']
+
+    polygons = {}
+    for feature in features:
+        properties = feature['properties']
+        if where and any(properties.get(k) != v for k, v in where.items()):
+            continue
+        polygons[str(properties[name_field])] = shape(feature['geometry'])
+    if not polygons:
+        raise ValueError(f"No se encontraron poligonos en {os.path.basename(path)}")
+    return polygons
+
+
+def _corners(centers):
+    """
+    Esquinas (ny+1, nx+1) de una malla de centros (ny, nx): promedio de los
+    cuatro centros vecinos, extrapolando en los bordes.
+    """
+    ny, nx = centers.shape
+    ext = np.empty((ny + 2, nx + 2))
+    ext[1:-1, 1:-1] = centers
+    ext[0, 1:-1] = 2 * centers[0] - centers[1]
+    ext[-1, 1:-1] = 2 * centers[-1] - centers[-2]
+    ext[:, 0] = 2 * ext[:, 1] - ext[:, 2]
+    ext[:, -1] = 2 * ext[:, -2] - ext[:, -3]
+    return 0.25 * (ext[:-1, :-1] + ext[1:, :-1] + ext[:-1, 1:] + ext[1:, 1:])
+
+
+def cell_polygons(lats, lons):
+    """
+    Poligonos de las celdas de la malla en coordenadas Mercator.
+
+    Regresa:
+    numpy.ndarray: Arreglo plano (ny*nx) de poligonos de shapely
+    """
+    xy = mercator(lats, lons)
+    cy, cx = _corners(xy[..., 0]), _corners(xy[..., 1])
+    ring = np.stack([
+        np.stack([cx[:-1, :-1], cy[:-1, :-1]], axis=-1),
+        np.stack([cx[:-1, 1:], cy[:-1, 1:]], axis=-1),
+        np.stack([cx[1:, 1:], cy[1:, 1:]], axis=-1),
+        np.stack([cx[1:, :-1], cy[1:, :-1]], axis=-1),
+    ], axis=2)
+    return shapely.polygons(ring.reshape(-1, 4, 2))
+
+
+def weights_footprint(rows, cells, data, n_rows, shape):
+    """
+    Footprint con matriz de pesos a partir de pesos sobre la malla completa.
+
+    Parametros:
+    rows (numpy.ndarray): Fila (region) de cada peso
+    cells (numpy.ndarray): Indice plano de la celda en la malla completa
+    data (numpy.ndarray): Pesos
+    n_rows (int): Numero de regiones
+    shape (tuple): Forma (ny, nx) de la malla
+
+    Regresa:
+    Footprint: Ventana minima con todas las celdas y pesos (regiones x
+    celdas de la ventana)
+    """
+    jj, ii = np.unravel_index(cells, shape)
+    y = slice(int(jj.min()), int(jj.max()) + 1)
+    x = slice(int(ii.min()), int(ii.max()) + 1)
+    width = x.stop - x.start
+    window_cells = (jj - y.start) * width + (ii - x.start)
+    weights = sparse.csr_matrix(
+        (data, (rows, window_cells)),
+        shape=(n_rows, (y.stop - y.start) * width),
+    )
+    return Footprint(y, x, None, None, weights)
+
+
+def _to_mercator(geometry):
+    """Proyecta una geometria lon/lat a Mercator (x, y)."""
+    return shapely.transform(geometry, lambda c: mercator(c[:, 1], c[:, 0])[:, ::-1])
+
+
+class Polygons(Selector):
+    """
+    Promedio ponderado por area sobre uno o varios poligonos.
+
+    El peso de cada celda es la fraccion de su area dentro del poligono,
+    asi que las celdas del borde cuentan parcialmente.
+
+    Parametros:
+    polygons (dict): {nombre: geometria de shapely en lon/lat}
+        (ver load_polygons)
+    """
+
+    def __init__(self, polygons):
+        self.polygons = dict(polygons)
+        self.labels = list(self.polygons)
+
+    def locate(self, lats, lons):
+        cells = cell_polygons(lats, lons)
+        tree = shapely.STRtree(cells)
+
+        rows, cols, data = [], [], []
+        for k, name in enumerate(self.labels):
+            geometry = _to_mercator(self.polygons[name])
+            idx = tree.query(geometry, predicate='intersects')
+            fraction = shapely.area(shapely.intersection(cells[idx], geometry)) / shapely.area(cells[idx])
+            idx, fraction = idx[fraction > 0], fraction[fraction > 0]
+            if idx.size == 0:
+                raise ValueError(f"El poligono {name} no contiene puntos de malla")
+            rows.append(np.full(idx.size, k))
+            cols.append(idx)
+            data.append(fraction / fraction.sum())
+
+        return weights_footprint(np.concatenate(rows), np.concatenate(cols),
+                                 np.concatenate(data), len(self.labels), lats.shape)
+
+    def cache_key(self):
+        digest = hashlib.sha1()
+        for name in self.labels:
+            digest.update(name.encode())
+            digest.update(shapely.to_wkb(self.polygons[name]))
+        return f"polygons:{digest.hexdigest()[:16]}"
+
+    def describe(self):
+        return {
+            'polygons': {
+                name: [round(v, 4) for v in geometry.bounds]
+                for name, geometry in self.polygons.items()
+            }
+        }
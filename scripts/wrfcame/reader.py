@@ -0,0 +1,62 @@
+"""
+Lector minimo de archivos wrfout basado en netCDF4.
+
+Abre el archivo sin decodificar ninguna variable (solo se leen los
+metadatos) y lee unicamente las variables pedidas y la ventana (y, x) del
+area de interes, en lugar de construir las ~200 variables del wrfout como
+hace xr.open_dataset.
+"""
+import netCDF4 as nc
+
+
+def open_wrf(path):
+    """
+    Abre un wrfout en modo lectura sin mascaras ni escalado automatico.
+
+    Parametros:
+    path (str): Ruta del archivo wrfout
+
+    Regresa:
+    netCDF4.Dataset: Archivo abierto (cerrar con .close())
+    """
+    ds = nc.Dataset(path, 'r')
+    ds.set_auto_maskandscale(False)
+    return ds
+
+
+def read_grid(ds):
+    """
+    Lee XLAT/XLONG del primer tiempo (la malla no cambia dentro del archivo).
+
+    Regresa:
+    tuple: (lats, lons) como arreglos 2D (south_north, west_east)
+    """
+    if 'XLAT' not in ds.variables or 'XLONG' not in ds.variables:
+        raise KeyError("XLAT/XLONG no encontrados en el archivo")
+    return ds.variables['XLAT'][0], ds.variables['XLONG'][0]
+
+
+def read_hyperslab(ds, var, y=slice(None), x=slice(None)):
+    """
+    Lee una variable restringida a la ventana (y, x).
+
+    Solo se leen del disco los valores de la ventana; las demas dimensiones
+    (Time, bottom_top, ...) se leen completas.
+
+    Parametros:
+    ds (netCDF4.Dataset): Archivo abierto con open_wrf
+    var (str): Nombre de la variable
+    y (slice): Ventana en south_north
+    x (slice): Ventana en west_east
+
+    Regresa:
+    numpy.ndarray: Valores con las mismas dimensiones que la variable
+    """
+    if var not in ds.variables:
+        raise KeyError(f"Variable {var} no encontrada en el archivo")
+    variable = ds.variables[var]
+    index = tuple(
+        y if dim == 'south_north' else x if dim == 'west_east' else slice(None)
+        for dim in variable.dimensions
+    )
+    return variable[index]
@@ -0,0 +1,283 @@
+"""
+Almacen de campos de superficie fragmentado para series de tiempo.
+
+Cada wrfout guarda un pronostico completo con los datos contiguos por
+tiempo (io_form_history = 2, frames_per_outfile = 1000): para la serie de
+un punto a lo largo de varios meses hay que abrir cientos de archivos y
+leer en cada uno un poco de cada tiempo. rechunk_file copia los campos de
+superficie de un pronostico a un almacen por dominio con forma
+(init, lead, south_north, west_east), comprimido y fragmentado en bloques de
+INIT_CHUNK pronosticos x todos los plazos x SPACE_CHUNK x SPACE_CHUNK
+celdas. La serie de un punto o de un area en un mes sale de unos pocos
+bloques contiguos de un solo archivo.
+
+El almacen es Zarr si la ruta termina en '.zarr' (requiere el paquete
+zarr) y NetCDF4/HDF5 en cualquier otro caso. Se alimenta despues de cada
+corrida (ver run-wrf.operativo2.sh):
+
+    python -m wrfcame rechunk wrfout_d02_2024-05-01_00.nc -o /LUSTRE/.../series_d02.zarr
+
+y se lee con extract_timeseries(<almacen>, backend='rechunked', ...) o
+con extract_rechunked.
+"""
+import os
+
+import netCDF4 as nc
+import numpy as np
+import pandas as pd
+
+from .diagnostics import read_fields
+from .engine import _reduce_columns, finalize_timeseries, utc_window
+from .grid_index import GEOMETRY_ATTRS
+from .reader import open_wrf, read_grid
+from .selectors import DomainMean
+from .times import read_init_time, read_times
+
+# Campos de superficie que se copian por omision
+SURFACE_FIELDS = ('SWDOWN', 'T2', 'Q2', 'U10', 'V10', 'PBLH')
+
+# Pronosticos por bloque y celdas por lado de cada bloque: con 121 plazos
+# en float32 un bloque ocupa ~7.6 MB sin comprimir
+INIT_CHUNK = 16
+SPACE_CHUNK = 32
+
+# Tiempo valido de los plazos que no tiene un pronostico (archivo mas corto)
+MISSING_TIME = -1
+
+DIMS = ('init', 'lead', 'south_north', 'west_east')
+
+
+class _NetCDFStore:
+    """Almacen NetCDF4 con la dimension init ilimitada."""
+
+    def __init__(self, path, mode):
+        self.ds = nc.Dataset(path, mode)
+        self.ds.set_auto_maskandscale(False)
+
+    @classmethod
+    def create(cls, path, n_leads, shape, attrs):
+        store = cls(path, 'w')
+        store.ds.createDimension('init', None)
+        store.ds.createDimension('lead', n_leads)
+        store.ds.createDimension('south_north', shape[0])
+        store.ds.createDimension('west_east', shape[1])
+        store.ds.setncatts(attrs)
+        return store
+
+    def __contains__(self, name):
+        return name in self.ds.variables
+
+    def __getitem__(self, name):
+        return self.ds.variables[name]
+
+    def create_array(self, name, dims, dtype, fill_value, chunks, attrs):
+        variable = self.ds.createVariable(name, dtype, dims, fill_value=fill_value,
+                                          chunksizes=chunks, compression='zlib',
+                                          complevel=4, shuffle=True)
+        variable.setncatts(attrs)
+
+    def n_inits(self):
+        return len(self.ds.dimensions['init'])
+
+    def grow(self, n):
+        # La dimension ilimitada crece al escribir
+        pass
+
+    def close(self):
+        self.ds.close()
+
+
+class _ZarrStore:
+    """Almacen Zarr (un grupo con un arreglo por variable)."""
+
+    def __init__(self, path, mode):
+        import zarr
+        self.group = zarr.open_group(path, mode=mode)
+
+    @classmethod
+    def create(cls, path, n_leads, shape, attrs):
+        store = cls(path, 'w')
+        store.group.attrs.update({**attrs, 'n_leads': n_leads, 'shape': list(shape)})
+        return store
+
+    def __contains__(self, name):
+        return name in self.group
+
+    def __getitem__(self, name):
+        return self.group[name]
+
+    def create_array(self, name, dims, dtype, fill_value, chunks, attrs):
+        sizes = {'init': self.n_inits(), 'lead': self.group.attrs['n_leads'],
+                 'south_north': self.group.attrs['shape'][0],
+                 'west_east': self.group.attrs['shape'][1]}
+        array = self.group.create_array(name, shape=tuple(sizes[d] for d in dims),
+                                        chunks=chunks, dtype=dtype, fill_value=fill_value,
+                                        dimension_names=dims)
+        array.attrs.update(attrs)
+
+    def n_inits(self):
+        return self.group['init_time'].shape[0] if 'init_time' in self.group else 0
+
+    def grow(self, n):
+        for _, array in self.group.arrays():
+            if array.metadata.dimension_names and array.metadata.dimension_names[0] == 'init':
+                array.resize((n,) + array.shape[1:])
+
+    def close(self):
+        pass
+
+
+def open_store(path, mode='r'):
+    """
+    Abre un almacen creado por rechunk_file ('.zarr' = Zarr, otro = NetCDF4).
+    """
+    store_class = _ZarrStore if path.rstrip('/').endswith('.zarr') else _NetCDFStore
+    return store_class(path, mode)
+
+
+def _create_store(path, n_leads, lats, lons, attrs, init_chunk):
+    store_class = _ZarrStore if path.rstrip('/').endswith('.zarr') else _NetCDFStore
+    store = store_class.create(path, n_leads, lats.shape, attrs)
+    store.create_array('init_time', ('init',), 'i8', None, (init_chunk,),
+                       {'units': 'seconds since 1970-01-01 00:00:00'})
+    store.create_array('valid_time', ('init', 'lead'), 'i8', MISSING_TIME,
+                       (init_chunk, n_leads), {'units': 'seconds since 1970-01-01 00:00:00'})
+    for name, grid in (('XLAT', lats), ('XLONG', lons)):
+        store.create_array(name, ('south_north', 'west_east'), 'f4', None, lats.shape,
+                           {'units': 'degree'})
+        store[name][:] = grid
+    return store
+
+
+def _seconds(times):
+    return np.asarray(times, dtype='datetime64[s]').astype(np.int64)
+
+
+def rechunk_file(path, store_path, variables=SURFACE_FIELDS, init_chunk=INIT_CHUNK,
+                 space_chunk=SPACE_CHUNK, n_leads=None):
+    """
+    Copia los campos de un wrfout al almacen fragmentado.
+
+    Si el pronostico (init_time) ya esta en el almacen se sobreescribe; si
+    no, se agrega al final. Las variables que el almacen aun no tiene se
+    crean (vacias para los pronosticos anteriores).
+
+    Parametros:
+    path (str): Ruta del archivo wrfout
+    store_path (str): Almacen ('.zarr' = Zarr, otro = NetCDF4)
+    variables (list): Variables 2D del wrfout y/o diagnosticos 2D (ver
+        diagnostics.DIAGNOSTICS)
+    init_chunk (int): Pronosticos por bloque (solo al crear el almacen o
+        una variable nueva)
+    space_chunk (int): Celdas por lado de cada bloque
+    n_leads (int, optional): Plazos del almacen al crearlo; por omision los
+        tiempos de este archivo (121 en las corridas de 120 h)
+
+    Regresa:
+    int: Posicion del pronostico en la dimension init
+    """
+    ds = open_wrf(path)
+    store = None
+    try:
+        n_times = len(ds.dimensions['Time'])
+        valid = _seconds(read_times(ds, path, n_times))
+        init = _seconds([read_init_time(ds, path)])[0]
+
+        if os.path.exists(store_path):
+            store = open_store(store_path, 'a')
+        else:
+            lats, lons = read_grid(ds)
+            # Atributos de geometria como tipos de Python (los atributos de Zarr son JSON)
+            attrs = {name: np.asarray(ds.getncattr(name)).item()
+                     for name in GEOMETRY_ATTRS if name in ds.ncattrs()}
+            store = _create_store(store_path, n_leads or n_times, lats, lons, attrs, init_chunk)
+        leads = store['valid_time'].shape[1]
+        if n_times > leads:
+            raise ValueError(f"El archivo tiene {n_times} tiempos y el almacen {leads} plazos")
+
+        inits = store['init_time'][:store.n_inits()]
+        existing = np.nonzero(inits == init)[0]
+        slot = int(existing[0]) if existing.size else store.n_inits()
+        store.grow(max(slot + 1, store.n_inits()))
+        store['init_time'][slot] = init
+        row = np.full(leads, MISSING_TIME, dtype=np.int64)
+        row[:n_times] = valid
+        store['valid_time'][slot, :] = row
+
+        for name, block in read_fields(ds, variables):
+            if block.ndim != 3:
+                raise ValueError(f"{name} no es un campo 2D por tiempo")
+            if name not in store:
+                ny, nx = block.shape[1:]
+                chunks = (init_chunk, leads, min(space_chunk, ny), min(space_chunk, nx))
+                attrs = {}
+                if name in ds.variables:
+                    source = ds.variables[name]
+                    attrs = {k: str(source.getncattr(k)) for k in ('units', 'description')
+                             if k in source.ncattrs()}
+                store.create_array(name, DIMS, 'f4', np.float32(np.nan), chunks, attrs)
+            values = np.full((leads,) + block.shape[1:], np.nan, dtype=np.float32)
+            values[:n_times] = block
+            store[name][slot] = values
+    finally:
+        ds.close()
+        if store is not None:
+            store.close()
+    return slot
+
+
+def extract_rechunked(store_path, variables=('SWDOWN',), selector=None, start=None, end=None,
+                      tz=None, overlap='latest'):
+    """
+    Series de tiempo desde el almacen fragmentado.
+
+    Solo se leen los pronosticos cuyos tiempos validos caen en [start, end]
+    (un rango contiguo de init) y la ventana del selector.
+
+    Parametros:
+    store_path (str): Almacen creado con rechunk_file
+    variables, selector, start, end, tz, overlap: Ver extract_timeseries
+
+    Regresa:
+    pandas.DataFrame: Mismo resultado que extract_timeseries, o None si no
+    hay pronosticos en la ventana
+    """
+    selector = selector or DomainMean()
+    store = open_store(store_path)
+    try:
+        n = store.n_inits()
+        valid = store['valid_time'][:n]
+        inits = store['init_time'][:n]
+        present = valid != MISSING_TIME
+        first = np.where(present, valid, np.iinfo(np.int64).max).min(axis=1)
+        last = np.where(present, valid, np.iinfo(np.int64).min).max(axis=1)
+        lo, hi = utc_window(start, end, tz)
+        keep = np.ones(n, dtype=bool)
+        if lo is not None:
+            keep &= last >= _seconds([lo])[0]
+        if hi is not None:
+            keep &= first <= _seconds([hi])[0]
+        rows = np.nonzero(keep)[0]
+        print(f"Existen {len(rows)} pronosticos en {os.path.basename(store_path.rstrip('/'))}")
+        if rows.size == 0:
+            return None
+        i0, i1 = int(rows.min()), int(rows.max()) + 1
+
+        footprint = selector.locate(store['XLAT'][:], store['XLONG'][:])
+        times = valid[i0:i1].ravel()
+        mask = keep[i0:i1].repeat(valid.shape[1]) & (times != MISSING_TIME)
+        columns = {}
+        for name in variables:
+            if name not in store:
+                raise KeyError(f"Variable {name} no encontrada en el almacen")
+            block = np.asarray(store[name][i0:i1, :, footprint.y, footprint.x])
+            block = block.reshape((-1,) + block.shape[2:])[mask]
+            _reduce_columns(columns, name, block, selector, footprint)
+        df = pd.DataFrame({'timestamp': times[mask].astype('datetime64[s]').astype('datetime64[ns]'),
+                           **columns})
+        init_time = inits[i0:i1].repeat(valid.shape[1])[mask]
+        df['init_time'] = init_time.astype('datetime64[s]').astype('datetime64[ns]')
+        df['lead_hour'] = ((times[mask] - init_time) // 3600).astype(np.int16)
+    finally:
+        store.close()
+    return finalize_timeseries(df, start, end, tz, overlap)
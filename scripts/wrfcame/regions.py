@@ -0,0 +1,89 @@
+"""
+Estadisticas de muchas regiones en una sola lectura y una sola reduccion.
+
+Regions junta varios selectores (BBox, Mask, Point, Polygons, Stations o
+regiones con nombre de REGIONS) en un solo selector: la ventana de lectura
+es la union de sus ventanas y todas las series salen de un producto
+matriz dispersa (series x celdas) por bloque. Las regiones pueden
+traslaparse (p. ej. CDMX dentro del area CAMe); agregar una region solo
+agrega una fila a la matriz.
+"""
+import hashlib
+
+import numpy as np
+
+from .grid_index import region
+from .polygons import weights_footprint
+from .selectors import Selector
+
+
+def _footprint_rows(footprint, shape):
+    """
+    Pesos de las series de un Footprint sobre la malla completa.
+
+    Regresa:
+    list: Una tupla (celdas planas, pesos) por serie del selector
+    """
+    y = range(*footprint.y.indices(shape[0]))
+    x = range(*footprint.x.indices(shape[1]))
+
+    def flat(jj, ii):
+        return (np.asarray(jj) + y.start) * shape[1] + (np.asarray(ii) + x.start)
+
+    if footprint.weights is not None:
+        weights = footprint.weights.tocsr()
+        rows = []
+        for k in range(weights.shape[0]):
+            row = weights.getrow(k)
+            jj, ii = np.divmod(row.indices, len(x))
+            rows.append((flat(jj, ii), row.data))
+        return rows
+    if footprint.cells is not None:
+        return [(flat([j], [i]), np.ones(1)) for j, i in footprint.cells]
+    if footprint.mask is not None:
+        jj, ii = np.nonzero(footprint.mask)
+    else:
+        jj, ii = np.divmod(np.arange(len(y) * len(x)), len(x))
+    return [(flat(jj, ii), np.full(len(jj), 1.0 / len(jj)))]
+
+
+class Regions(Selector):
+    """
+    Varias regiones en un solo selector; regresa (Time, series).
+
+    Parametros:
+    regions (dict, list): {nombre: selector}, o lista de nombres de REGIONS.
+        Los selectores de varias series (Stations, Polygons) generan las
+        columnas <nombre>_<etiqueta>
+    """
+
+    def __init__(self, regions):
+        if not isinstance(regions, dict):
+            regions = {name: region(name) for name in regions}
+        self.regions = dict(regions)
+        self.labels = []
+        for name, selector in self.regions.items():
+            if selector.labels is None:
+                self.labels.append(name)
+            else:
+                self.labels.extend(f"{name}_{label}" for label in selector.labels)
+
+    def locate(self, lats, lons):
+        rows, cells, data = [], [], []
+        for selector in self.regions.values():
+            for flat, weights in _footprint_rows(selector.locate(lats, lons), lats.shape):
+                rows.append(np.full(len(flat), len(rows)))
+                cells.append(flat)
+                data.append(weights)
+        return weights_footprint(np.concatenate(rows), np.concatenate(cells),
+                                 np.concatenate(data), len(rows), lats.shape)
+
+    def cache_key(self):
+        keys = [selector.cache_key() for selector in self.regions.values()]
+        if any(key is None for key in keys):
+            return None
+        text = repr(list(zip(self.regions, keys)))
+        return f"regions:{hashlib.sha1(text.encode()).hexdigest()[:16]}"
+
+    def describe(self):
+        return {name: selector.describe() for name, selector in self.regions.items()}
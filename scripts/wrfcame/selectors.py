@@ -0,0 +1,178 @@
+"""
+Selectores espaciales para la extraccion de series de tiempo de WRF.
+
+Un selector resuelve, a partir de la malla XLAT/XLONG del dominio, la
+ventana rectangular (y, x) que hay que leer de cada archivo y la forma de
+reducir esa ventana a una serie de tiempo.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+# Ventana de lectura: slices en south_north / west_east, mascara booleana
+# relativa a la ventana (None = todas las celdas de la ventana); para los
+# selectores de varios puntos, indices (j, i) ordenados relativos a la ventana
+# y, para los poligonos, matriz dispersa de pesos (regiones x celdas de la
+# ventana aplanada)
+Footprint = namedtuple('Footprint', ['y', 'x', 'mask', 'cells', 'weights'],
+                       defaults=[None, None])
+
+
+def _window_from_mask(mask):
+    """
+    Calcula la ventana minima que contiene todas las celdas de una mascara.
+
+    Parametros:
+    mask (numpy.ndarray): Mascara booleana 2D sobre la malla completa
+
+    Regresa:
+    Footprint: Ventana (y, x) y mascara recortada a la ventana
+    """
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    if rows.size == 0:
+        raise ValueError("El area de interes no contiene puntos de malla")
+    y = slice(int(rows[0]), int(rows[-1]) + 1)
+    x = slice(int(cols[0]), int(cols[-1]) + 1)
+    sub = mask[y, x]
+    return Footprint(y, x, None if sub.all() else sub)
+
+
+class Selector:
+    """
+    Selector base: promedio sobre todo el dominio.
+
+    Las subclases redefinen `locate` y, si su salida no es una sola serie,
+    `reduce` y `labels`.
+    """
+    # Etiquetas de las columnas que produce `reduce`; None = una sola serie
+    labels = None
+
+    def locate(self, lats, lons):
+        """
+        Regresa la ventana de lectura para la malla dada.
+
+        Parametros:
+        lats (numpy.ndarray): XLAT 2D del dominio
+        lons (numpy.ndarray): XLONG 2D del dominio
+
+        Regresa:
+        Footprint: Ventana de lectura
+        """
+        return Footprint(slice(None), slice(None), None)
+
+    def reduce(self, block, footprint):
+        """
+        Reduce un bloque (Time, y, x) leido con `footprint` a una serie.
+
+        Parametros:
+        block (numpy.ndarray): Valores leidos en la ventana
+        footprint (Footprint): Ventana regresada por `locate`
+
+        Regresa:
+        numpy.ndarray: Serie de tiempo (Time,), o (Time, regiones) si la
+        ventana tiene matriz de pesos
+        """
+        if footprint.weights is not None:
+            values = block.reshape(block.shape[0], -1)
+            return np.asarray(footprint.weights @ values.T).T
+        if footprint.mask is None:
+            return block.mean(axis=(1, 2))
+        return block[:, footprint.mask].mean(axis=1)
+
+    def cache_key(self):
+        """
+        Clave para guardar la ventana en el indice de malla (grid_index).
+
+        None indica que la ventana se resuelve siempre sobre XLAT/XLONG.
+        """
+        return None
+
+    def describe(self):
+        """Metadatos del area seleccionada (para los archivos de salida)."""
+        return {}
+
+
+class DomainMean(Selector):
+    """Promedio espacial sobre todo el dominio."""
+
+    def cache_key(self):
+        return 'domain'
+
+
+class Point(Selector):
+    """
+    Punto de malla mas cercano a (lat, lon).
+
+    Parametros:
+    lat (float): Latitud del punto de interes
+    lon (float): Longitud del punto de interes
+    """
+
+    def __init__(self, lat, lon):
+        self.lat = lat
+        self.lon = lon
+
+    def locate(self, lats, lons):
+        dist = np.abs(lats - self.lat) + np.abs(lons - self.lon)
+        y_idx, x_idx = np.unravel_index(dist.argmin(), dist.shape)
+        return Footprint(slice(y_idx, y_idx + 1), slice(x_idx, x_idx + 1), None)
+
+    def cache_key(self):
+        return f"point:{self.lat},{self.lon}"
+
+    def describe(self):
+        return {'lat': self.lat, 'lon': self.lon}
+
+
+class BBox(Selector):
+    """
+    Promedio sobre las celdas dentro de una caja lat/lon.
+
+    Parametros:
+    lat_bounds (tuple): (min_lat, max_lat) en grados decimales
+    lon_bounds (tuple): (min_lon, max_lon) en grados decimales
+    """
+
+    def __init__(self, lat_bounds, lon_bounds):
+        self.lat_bounds = tuple(lat_bounds)
+        self.lon_bounds = tuple(lon_bounds)
+
+    def locate(self, lats, lons):
+        mask = (
+            (lats >= self.lat_bounds[0]) &
+            (lats <= self.lat_bounds[1]) &
+            (lons >= self.lon_bounds[0]) &
+            (lons <= self.lon_bounds[1])
+        )
+        return _window_from_mask(mask)
+
+    def cache_key(self):
+        return f"bbox:{self.lat_bounds[0]},{self.lat_bounds[1]},{self.lon_bounds[0]},{self.lon_bounds[1]}"
+
+    def describe(self):
+        return {
+            'lat_min': self.lat_bounds[0],
+            'lat_max': self.lat_bounds[1],
+            'lon_min': self.lon_bounds[0],
+            'lon_max': self.lon_bounds[1],
+        }
+
+
+class Mask(Selector):
+    """
+    Promedio sobre las celdas marcadas en una mascara booleana 2D.
+
+    Parametros:
+    mask (numpy.ndarray): Mascara (south_north, west_east) del dominio
+    """
+
+    def __init__(self, mask):
+        self.mask = np.asarray(mask, dtype=bool)
+
+    def locate(self, lats, lons):
+        if self.mask.shape != lats.shape:
+            raise ValueError(
+                f"La mascara {self.mask.shape} no coincide con la malla {lats.shape}"
+            )
+        return _window_from_mask(self.mask)
@@ -0,0 +1,326 @@
+"""
+Almacen columnar (Parquet) de las series extraidas.
+
+Reemplaza los CSV por mes (swdown_*_horarios.csv, *_diarios_max.csv) con
+un solo directorio particionado por anio/mes/dominio/region:
+
+    <root>/year=2022/month=5/domain=d02/region=came/part-<id>.parquet
+
+Los tiempos se guardan como timestamp tipado en UTC, y las consultas por rango de
+fechas solo leen las particiones y grupos de filas que lo cubren. Los
+metadatos de cada region (limites del area, estaciones) se guardan una sola
+vez en <root>/_regions.json en lugar de repetirse en cada fila.
+
+Los pronosticos diarios de 120 h se traslapan: el almacen conserva todos
+los ciclos, con init_time y lead_hour (horas de pronostico) en cada fila y
+los archivos ordenados por (init_time, lead_hour). load_store resuelve los
+traslapes (el pronostico mas reciente por tiempo valido) y load_forecasts
+consulta por ciclo y plazo, p. ej. todos los plazos de 24 a 48 h de mayo.
+"""
+import os
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .config import read_json, write_json_atomic
+from .times import keep_latest_init, lead_hours, localize_times
+
+PARTITION_SCHEMA = pa.schema([
+    ('year', pa.int16()),
+    ('month', pa.int8()),
+    ('domain', pa.string()),
+    ('region', pa.string()),
+])
+
+PARTITIONING = ds.partitioning(PARTITION_SCHEMA, flavor='hive')
+
+# Tabla de dimension de regiones (pyarrow omite los archivos que empiezan con '_')
+REGIONS_NAME = '_regions.json'
+
+
+def _read_regions(root):
+    return read_json(os.path.join(root, REGIONS_NAME), {})
+
+
+def _save_region_attrs(root, domain, region, attrs):
+    """Guarda los metadatos de una region (reemplazo atomico)."""
+    regions = _read_regions(root)
+    regions[f"{domain}/{region}"] = attrs
+    write_json_atomic(os.path.join(root, REGIONS_NAME), regions, indent=1)
+
+
+def region_table(root):
+    """
+    Metadatos de las regiones del almacen.
+
+    Regresa:
+    pandas.DataFrame: Una fila por (domain, region)
+    """
+    rows = []
+    for key, attrs in _read_regions(root).items():
+        domain, region = key.split('/', 1)
+        rows.append({'domain': domain, 'region': region, **attrs})
+    return pd.DataFrame(rows).set_index(['domain', 'region']) if rows else pd.DataFrame()
+
+
+def append_to_store(df, root, domain, region, basename=None, attrs=None):
+    """
+    Agrega una serie al almacen.
+
+    Parametros:
+    df (pandas.DataFrame): Columna 'timestamp' y columnas de variables,
+        con 'init_time' si se quieren conservar los ciclos traslapados
+        (lead_hour se calcula si falta)
+    root (str): Directorio raiz del almacen
+    domain (str): Dominio ('d01', 'd02', ...)
+    region (str): Nombre de la region o seleccion espacial
+    basename (str, optional): Prefijo de los archivos Parquet; por omision
+        un identificador aleatorio. Escribir de nuevo con el mismo prefijo
+        reemplaza los archivos de las mismas particiones.
+    attrs (dict, optional): Metadatos de la region (p. ej.
+        selector.describe()) que se guardan en _regions.json; por omision
+        df.attrs (que se pierde al seleccionar columnas)
+
+    Regresa:
+    list: Rutas de los archivos Parquet escritos
+    """
+    if df is None or df.empty:
+        return []
+    table = df.reset_index(drop=True).copy()
+    table['timestamp'] = pd.to_datetime(table['timestamp'])
+    if 'init_time' in table.columns:
+        if 'lead_hour' not in table.columns:
+            table['lead_hour'] = lead_hours(table['timestamp'], table['init_time'])
+        # Filas ordenadas por ciclo y plazo: las estadisticas de los grupos
+        # de filas permiten filtrar por init_time/lead_hour sin leerlos
+        table = table.sort_values(['init_time', 'lead_hour'], kind='stable', ignore_index=True)
+    table['year'] = table['timestamp'].dt.year.astype('int16')
+    table['month'] = table['timestamp'].dt.month.astype('int8')
+    table['domain'] = domain
+    table['region'] = region
+
+    basename = basename or uuid.uuid4().hex
+    written = []
+    pq.write_to_dataset(
+        pa.Table.from_pandas(table, preserve_index=False),
+        root,
+        partitioning=PARTITIONING,
+        basename_template=f"part-{basename}-{{i}}.parquet",
+        file_visitor=lambda f: written.append(f.path),
+    )
+    attrs = df.attrs if attrs is None else attrs
+    if attrs:
+        _save_region_attrs(root, domain, region, attrs)
+    return written
+
+
+def _and(*terms):
+    expr = None
+    for term in terms:
+        if term is not None:
+            expr = term if expr is None else expr & term
+    return expr
+
+
+def _partition_filter(start, end, domain, region):
+    terms = []
+    year_month = ds.field('year').cast(pa.int32()) * 100 + ds.field('month').cast(pa.int32())
+    if start is not None:
+        start = pd.Timestamp(start)
+        terms.append(year_month >= start.year * 100 + start.month)
+    if end is not None:
+        end = pd.Timestamp(end)
+        terms.append(year_month <= end.year * 100 + end.month)
+    if domain is not None:
+        terms.append(ds.field('domain') == domain)
+    if region is not None:
+        terms.append(ds.field('region') == region)
+    return _and(*terms)
+
+
+def _range_filter(schema, name, low, high):
+    """Filtro low <= name <= high (extremos None = abierto)."""
+    terms = []
+    if low is not None:
+        terms.append(ds.field(name) >= pa.scalar(low, type=schema.field(name).type))
+    if high is not None:
+        terms.append(ds.field(name) <= pa.scalar(high, type=schema.field(name).type))
+    return _and(*terms)
+
+
+def _open_dataset(root, partition_expr):
+    """
+    Dataset con los archivos de las particiones pedidas, o None si no hay.
+
+    Las regiones pueden tener columnas distintas (p. ej. una por estacion):
+    se unifica el esquema solo de los archivos de las particiones pedidas.
+    """
+    dataset = ds.dataset(root, format='parquet', partitioning=PARTITIONING)
+    fragments = list(dataset.get_fragments(filter=partition_expr))
+    if not fragments:
+        return None
+    schema = pa.unify_schemas([f.physical_schema for f in fragments] + [PARTITION_SCHEMA])
+    return ds.dataset([f.path for f in fragments], schema=schema, format='parquet',
+                      partitioning=PARTITIONING, partition_base_dir=root)
+
+
+def _read(dataset, expr, columns):
+    """Lee las filas que cumplen `expr`, con domain/region categoricas."""
+    names = dataset.schema.names
+    if columns is not None:
+        keys = ['timestamp', 'domain', 'region'] + [c for c in ('init_time', 'lead_hour') if c in names]
+        columns = keys + [c for c in columns if c in names and c not in keys]
+
+    df = dataset.to_table(columns=columns, filter=expr).to_pandas()
+    df = df.drop(columns=[c for c in ('year', 'month') if c in df.columns])
+    for column in ('domain', 'region'):
+        df[column] = df[column].astype('category')
+    return df
+
+
+def _attach_regions(df, root):
+    regions = _read_regions(root)
+    loaded = df[['domain', 'region']].drop_duplicates().itertuples(index=False)
+    keys = (f"{domain}/{region}" for domain, region in loaded)
+    df.attrs['regions'] = {key: regions[key] for key in keys if key in regions}
+    return df
+
+
+def load_store(root, start=None, end=None, domain=None, region=None, columns=None,
+               overlap='latest', tz=None):
+    """
+    Lee un rango de fechas del almacen.
+
+    Parametros:
+    root (str): Directorio raiz del almacen
+    start (str, datetime, optional): Inicio del rango (inclusive)
+    end (str, datetime, optional): Fin del rango (inclusive)
+    domain (str, optional): Dominio a leer
+    region (str, optional): Region a leer
+    columns (list, optional): Variables a leer (ademas de timestamp,
+        domain y region); None = todas
+    overlap (str): Si las filas tienen init_time, 'latest' conserva por
+        tiempo valido solo el pronostico mas reciente; 'all' las conserva todas
+    tz (str, optional): Zona horaria IANA de la salida; los tiempos se
+        guardan en UTC. start/end se interpretan en esta zona
+
+    Regresa:
+    pandas.DataFrame: Filas ordenadas por timestamp, con domain/region
+    categoricas y df.attrs['regions'] = metadatos de las regiones leidas
+    """
+    # Con zona horaria, el filtro en disco (UTC) se amplia un dia y el corte
+    # exacto se hace despues de convertir a hora local
+    margin = pd.Timedelta(days=1) if tz is not None else pd.Timedelta(0)
+    start_utc = None if start is None else pd.Timestamp(start) - margin
+    end_utc = None if end is None else pd.Timestamp(end) + margin
+
+    partition_expr = _partition_filter(start_utc, end_utc, domain, region)
+    dataset = _open_dataset(root, partition_expr)
+    if dataset is None:
+        return pd.DataFrame(columns=['timestamp'])
+
+    expr = _and(partition_expr, _range_filter(dataset.schema, 'timestamp', start_utc, end_utc))
+    df = _read(dataset, expr, columns)
+    if overlap == 'latest' and 'init_time' in df.columns and df['init_time'].notna().all():
+        df = keep_latest_init(df)
+    else:
+        df = df.sort_values('timestamp', kind='stable', ignore_index=True)
+
+    if tz is not None:
+        df = localize_times(df, tz)
+        if start is not None:
+            df = df[df['timestamp'] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df['timestamp'] <= pd.Timestamp(end)]
+        df = df.reset_index(drop=True)
+
+    return _attach_regions(df, root)
+
+
+def load_forecasts(root, leads=None, init_start=None, init_end=None, start=None, end=None,
+                   domain=None, region=None, columns=None, tz=None):
+    """
+    Lee los pronosticos del almacen por ciclo (init_time) y plazo (lead_hour).
+
+    A diferencia de load_store no se resuelven los traslapes: cada tiempo
+    valido aparece una vez por ciclo que lo cubre. Los filtros se aplican
+    sobre las particiones y las estadisticas de los grupos de filas, asi que
+    "todos los plazos de 24 a 48 h de mayo" solo lee esas filas:
+
+        load_forecasts(root, leads=(24, 48), start='2022-05-01', end='2022-05-31 23:00')
+
+    Parametros:
+    root (str): Directorio raiz del almacen
+    leads (tuple, optional): Plazos (min, max) en horas, inclusive
+    init_start (str, datetime, optional): Primer inicio de pronostico (inclusive)
+    init_end (str, datetime, optional): Ultimo inicio de pronostico (inclusive)
+    start (str, datetime, optional): Inicio del rango de tiempos validos (inclusive)
+    end (str, datetime, optional): Fin del rango de tiempos validos (inclusive)
+    domain (str, optional): Dominio a leer
+    region (str, optional): Region a leer
+    columns (list, optional): Variables a leer; None = todas
+    tz (str, optional): Zona horaria IANA de timestamp e init_time en la
+        salida; init_start/init_end y start/end se interpretan en ella
+
+    Regresa:
+    pandas.DataFrame: Indice (init_time, lead_hour) ordenado, con las
+    columnas timestamp, domain, region y las variables. Con varias regiones
+    el indice se repite una vez por (domain, region)
+    """
+    margin = pd.Timedelta(days=1) if tz is not None else pd.Timedelta(0)
+
+    def widen(value, sign):
+        return None if value is None else pd.Timestamp(value) + sign * margin
+
+    lead_min, lead_max = leads if leads is not None else (None, None)
+    init_lo, init_hi = widen(init_start, -1), widen(init_end, 1)
+    valid_lo, valid_hi = widen(start, -1), widen(end, 1)
+    # Los tiempos validos de un ciclo van de init_time + lead_min a
+    # init_time + lead_max: con eso se descartan particiones completas
+    if init_lo is not None:
+        bound = init_lo + pd.Timedelta(hours=lead_min or 0)
+        valid_lo = bound if valid_lo is None else max(valid_lo, bound)
+    if init_hi is not None and lead_max is not None:
+        bound = init_hi + pd.Timedelta(hours=lead_max)
+        valid_hi = bound if valid_hi is None else min(valid_hi, bound)
+
+    partition_expr = _partition_filter(valid_lo, valid_hi, domain, region)
+    dataset = _open_dataset(root, partition_expr)
+    if dataset is None:
+        return pd.DataFrame(columns=['timestamp'],
+                            index=pd.MultiIndex.from_arrays([[], []], names=['init_time', 'lead_hour']))
+    names = dataset.schema.names
+    if 'init_time' not in names:
+        raise ValueError("El almacen no tiene init_time: las series se guardaron sin los ciclos "
+                         "(escribirlas con overlap='all', p. ej. con extract_incremental)")
+
+    expr = _and(partition_expr,
+                _range_filter(dataset.schema, 'timestamp', valid_lo, valid_hi),
+                _range_filter(dataset.schema, 'init_time', init_lo, init_hi))
+    # Solo si todos los archivos tienen lead_hour (los anteriores lo tendrian nulo)
+    if all('lead_hour' in f.physical_schema.names for f in dataset.get_fragments()):
+        expr = _and(expr, _range_filter(dataset.schema, 'lead_hour', lead_min, lead_max))
+    df = _read(dataset, expr, columns)
+
+    # Archivos escritos antes de que existiera lead_hour
+    if 'lead_hour' in df.columns and df['lead_hour'].isna().any():
+        df = df.drop(columns='lead_hour')
+    if 'lead_hour' not in df.columns:
+        df['lead_hour'] = lead_hours(df['timestamp'], df['init_time'])
+        if leads is not None:
+            df = df[df['lead_hour'].between(lead_min, lead_max)]
+    df['lead_hour'] = df['lead_hour'].astype('int16')
+
+    if tz is not None:
+        df = localize_times(df, tz)
+        for column, low, high in (('init_time', init_start, init_end), ('timestamp', start, end)):
+            if low is not None:
+                df = df[df[column] >= pd.Timestamp(low)]
+            if high is not None:
+                df = df[df[column] <= pd.Timestamp(high)]
+
+    df = df.set_index(['init_time', 'lead_hour']).sort_index(kind='stable')
+    return _attach_regions(df, root)
@@ -0,0 +1,155 @@
+"""
+Extraccion en flujo con memoria acotada para archivos de varios anios.
+
+En lugar de juntar todos los DataFrames por archivo y despues agrupar por
+fecha, stream_timeseries genera el resultado de cada archivo y
+RunningDailyStats actualiza en linea los estadisticos diarios (promedio,
+maximo, minimo y desviacion estandar) sin guardar la serie horaria.
+"""
+import numpy as np
+import pandas as pd
+
+from .engine import find_wrf_files, iter_files, utc_window
+from .times import keep_latest_init, localize_times
+
+
+def stream_timeseries(wrf_dir, domain='d02', variables=('SWDOWN',), selector=None,
+                      start=None, end=None, tz=None, workers=1, overlap='latest',
+                      inventory=True, field_cache=None):
+    """
+    Genera el DataFrame de cada wrfout en orden de archivo.
+
+    Mismos parametros que extract_timeseries (sin backend ni instrument);
+    cada DataFrame se convierte a la zona `tz`, se recorta a la ventana
+    [start, end] y se descarta despues de consumirse.
+
+    Con overlap='latest' solo se retienen las filas a partir del inicio del
+    ultimo archivo leido (los archivos se leen en orden de inicio del
+    pronostico); las filas anteriores ya son definitivas y se entregan, de
+    modo que el resultado coincide con extract_timeseries.
+    """
+    def finish(df):
+        if overlap == 'latest':
+            df = df.drop(columns=['init_time', 'lead_hour']).reset_index(drop=True)
+        if tz is not None:
+            df = localize_times(df, tz)
+        if start is not None:
+            df = df[df['timestamp'] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df['timestamp'] <= pd.Timestamp(end)]
+        return df
+
+    wrf_files = find_wrf_files(wrf_dir, domain, *utc_window(start, end, tz), inventory)
+    print(f"Existen {len(wrf_files)} archivos de salidas de WRF ")
+
+    pending = None
+    for _, df in iter_files(wrf_files, variables, selector, workers, field_cache=field_cache):
+        if overlap != 'latest':
+            ready = finish(df)
+        elif pending is None:
+            pending, ready = df, None
+        else:
+            df = keep_latest_init(pd.concat([pending, df], ignore_index=True))
+            cutoff = df['init_time'].max()
+            ready = finish(df[df['timestamp'] < cutoff])
+            pending = df[df['timestamp'] >= cutoff]
+        if ready is not None and not ready.empty:
+            yield ready
+    if pending is not None:
+        ready = finish(pending)
+        if not ready.empty:
+            yield ready
+
+
+class RunningDailyStats:
+    """
+    Estadisticos diarios acumulados en linea (algoritmo de Chan/Welford).
+
+    Solo se guarda por dia y variable: n, promedio, M2, minimo y maximo.
+
+    Parametros:
+    variables (list): Columnas a resumir
+    """
+
+    def __init__(self, variables=('SWDOWN',)):
+        self.variables = list(variables)
+        self._acc = {}
+
+    def update(self, df):
+        """
+        Agrega un bloque con columna 'timestamp' y las variables.
+        """
+        days = df['timestamp'].dt.floor('D')
+        for var in self.variables:
+            grouped = df[var].astype('float64').groupby(days)
+            batch = pd.DataFrame({
+                'n': grouped.count(),
+                'mean': grouped.mean(),
+                'm2': grouped.var(ddof=0) * grouped.count(),
+                'min': grouped.min(),
+                'max': grouped.max(),
+            })
+            acc = self._acc.get(var)
+            self._acc[var] = batch if acc is None else self._merge(acc, batch)
+
+    @staticmethod
+    def _merge(a, b):
+        index = a.index.union(b.index)
+        a = a.reindex(index)
+        b = b.reindex(index)
+        na = a['n'].fillna(0).to_numpy()
+        nb = b['n'].fillna(0).to_numpy()
+        n = na + nb
+        ma = a['mean'].fillna(0).to_numpy()
+        mb = b['mean'].fillna(0).to_numpy()
+        delta = mb - ma
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(n > 0, ma + delta * nb / n, np.nan)
+            m2 = (a['m2'].fillna(0).to_numpy() + b['m2'].fillna(0).to_numpy()
+                  + delta ** 2 * na * nb / n)
+        return pd.DataFrame({
+            'n': n,
+            'mean': mean,
+            'm2': m2,
+            'min': np.fmin(a['min'].to_numpy(), b['min'].to_numpy()),
+            'max': np.fmax(a['max'].to_numpy(), b['max'].to_numpy()),
+        }, index=index)
+
+    def result(self, stats=('mean', 'max', 'min', 'std')):
+        """
+        Tabla de estadisticos diarios con el mismo formato que
+        daily_statistics: indice 'date' y columnas (variable, estadistico).
+        """
+        columns = {}
+        for var in self.variables:
+            acc = self._acc.get(var)
+            if acc is None:
+                continue
+            with np.errstate(invalid='ignore', divide='ignore'):
+                std = np.sqrt(acc['m2'] / (acc['n'] - 1)).where(acc['n'] > 1)
+            values = {'mean': acc['mean'], 'max': acc['max'], 'min': acc['min'],
+                      'std': std, 'count': acc['n']}
+            for stat in stats:
+                columns[(var, stat)] = values[stat]
+        table = pd.DataFrame(columns)
+        table.index = pd.DatetimeIndex(table.index, name='date')
+        return table.round(2)
+
+
+def stream_daily_statistics(wrf_dir, domain='d02', variables=('SWDOWN',), selector=None,
+                            start=None, end=None, tz=None, workers=1,
+                            overlap='latest', stats=('mean', 'max', 'min', 'std'),
+                            inventory=True, field_cache=None):
+    """
+    Estadisticos diarios de todo un archivo de salidas con memoria acotada.
+
+    Mismos parametros que extract_timeseries mas `stats`.
+
+    Regresa:
+    pandas.DataFrame: Estadisticos diarios (ver RunningDailyStats.result)
+    """
+    running = RunningDailyStats(variables)
+    for df in stream_timeseries(wrf_dir, domain, variables, selector, start, end,
+                                tz, workers, overlap, inventory, field_cache):
+        running.update(df)
+    return running.result(stats)
@@ -0,0 +1,167 @@
+"""
+Decodificacion de tiempos de los archivos wrfout.
+
+Los tiempos validos se leen de la variable Times (arreglo de caracteres
+'YYYY-MM-DD_HH:MM:SS') o de XTIME, en una sola operacion de NumPy para
+todos los tiempos del archivo. Asi no se supone salida horaria sin huecos
+(history_interval, reinicios) ni se depende del nombre del archivo.
+"""
+import os
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+def init_time_from_filename(path):
+    """
+    Fecha de inicio del pronostico a partir del nombre wrfout_d0X_YYYY-MM-DD_HH.nc
+    """
+    file_time_str = os.path.basename(path).split('_')[2:4]
+    file_time_str = '_'.join(file_time_str).replace('.nc', '')
+    return datetime.strptime(file_time_str, '%Y-%m-%d_%H')
+
+
+def decode_times(chars):
+    """
+    Convierte el arreglo de caracteres Times de WRF a datetime64.
+
+    Parametros:
+    chars (numpy.ndarray): Arreglo (Time, DateStrLen) de tipo S1
+
+    Regresa:
+    numpy.ndarray: Tiempos datetime64[ns]
+    """
+    chars = np.asarray(chars)
+    digits = chars.view('u1').reshape(chars.shape[0], -1)[:, :19].astype(np.int64) - 48
+
+    def field(start, width):
+        value = np.zeros(len(digits), dtype=np.int64)
+        for k in range(start, start + width):
+            value = value * 10 + digits[:, k]
+        return value
+
+    year, month, day = field(0, 4), field(5, 2), field(8, 2)
+    seconds = field(11, 2) * 3600 + field(14, 2) * 60 + field(17, 2)
+
+    months = (year - 1970) * 12 + (month - 1)
+    dates = months.astype('datetime64[M]').astype('datetime64[D]') + (day - 1)
+    return (dates.astype('datetime64[s]') + seconds).astype('datetime64[ns]')
+
+
+def decode_xtime(values, units):
+    """
+    Convierte XTIME ('minutes since YYYY-MM-DD HH:MM:SS') a datetime64.
+    """
+    match = re.match(r'\s*minutes since\s+(\d{4}-\d{2}-\d{2})[ _T](\d{2}:\d{2}:\d{2})', units)
+    if match is None:
+        raise ValueError(f"Unidades de XTIME no reconocidas: {units}")
+    base = np.datetime64(f"{match.group(1)}T{match.group(2)}", 's')
+    seconds = np.rint(np.asarray(values, dtype=np.float64) * 60).astype('timedelta64[s]')
+    return (base + seconds).astype('datetime64[ns]')
+
+
+def read_times(ds, path=None, n_times=None):
+    """
+    Tiempos validos de un wrfout abierto con open_wrf.
+
+    Usa Times, luego XTIME y, como ultimo recurso, la fecha del nombre del
+    archivo con salida horaria.
+
+    Parametros:
+    ds (netCDF4.Dataset): Archivo abierto
+    path (str, optional): Ruta del archivo (para el ultimo recurso)
+    n_times (int, optional): Numero de tiempos (para el ultimo recurso)
+
+    Regresa:
+    numpy.ndarray: Tiempos datetime64[ns]
+    """
+    if 'Times' in ds.variables:
+        times = ds.variables['Times']
+        times.set_auto_chartostring(False)
+        return decode_times(times[:])
+    if 'XTIME' in ds.variables:
+        xtime = ds.variables['XTIME']
+        return decode_xtime(xtime[:], xtime.getncattr('units'))
+    start = init_time_from_filename(path)
+    return pd.date_range(start=start, periods=n_times, freq='h').values.astype('datetime64[ns]')
+
+
+def read_init_time(ds, path=None):
+    """
+    Fecha de inicio del pronostico (SIMULATION_START_DATE o nombre del archivo).
+    """
+    if 'SIMULATION_START_DATE' in ds.ncattrs():
+        value = str(ds.getncattr('SIMULATION_START_DATE'))
+        if not value.startswith('0000'):
+            return pd.Timestamp(value.replace('_', ' '))
+    return pd.Timestamp(init_time_from_filename(path))
+
+
+def to_local(values, tz='America/Mexico_City'):
+    """
+    Convierte tiempos UTC sin zona a hora local de `tz` (sin zona).
+
+    Usa las reglas de la base de datos IANA, incluido el horario de verano
+    que se aplicaba en la Ciudad de Mexico hasta 2022. Para la hora estandar
+    fija (UTC-6) usar tz='Etc/GMT+6'.
+
+    Parametros:
+    values (pandas.Series, numpy.ndarray): Tiempos datetime64 en UTC
+    tz (str): Zona horaria IANA
+
+    Regresa:
+    Mismo tipo de entrada con la hora local
+    """
+    index = pd.DatetimeIndex(values).tz_localize('UTC').tz_convert(tz).tz_localize(None)
+    if isinstance(values, pd.Series):
+        return pd.Series(index, index=values.index, name=values.name)
+    return index.values
+
+
+def localize_times(df, tz):
+    """
+    Aplica to_local a las columnas de tiempo (timestamp, init_time) de un DataFrame.
+    """
+    df = df.copy()
+    for column in ('timestamp', 'init_time'):
+        if column in df.columns:
+            df[column] = to_local(df[column], tz)
+    return df
+
+
+def keep_latest_init(df):
+    """
+    Para cada tiempo valido conserva solo el pronostico mas reciente.
+
+    Con pronosticos diarios de 120 h los archivos se traslapan; en lugar de
+    mezclar los valores de varios ciclos, se queda el de init_time mayor.
+    Si existen las columnas domain/region, el criterio se aplica por cada una.
+
+    Parametros:
+    df (pandas.DataFrame): Columnas 'timestamp' e 'init_time'
+
+    Regresa:
+    pandas.DataFrame: Filas unicas por tiempo valido, ordenadas por timestamp
+    """
+    keys = ['timestamp'] + [c for c in ('domain', 'region') if c in df.columns]
+    df = df.sort_values(keys + ['init_time'], kind='stable')
+    df = df.drop_duplicates(subset=keys, keep='last')
+    return df.sort_values('timestamp', kind='stable', ignore_index=True)
+
+
+def lead_hours(timestamps, init_times):
+    """
+    Horas de pronostico (tiempo valido - inicio del pronostico).
+
+    Parametros:
+    timestamps (pandas.Series, numpy.ndarray): Tiempos validos
+    init_times (pandas.Series, numpy.ndarray, pandas.Timestamp): Inicio
+        del pronostico de cada tiempo (o uno solo para todos)
+
+    Regresa:
+    numpy.ndarray: Horas enteras int16 (0-119 en las corridas de 120 h)
+    """
+    delta = np.asarray(timestamps, dtype='datetime64[ns]') - np.asarray(init_times, dtype='datetime64[ns]')
+    return (delta // np.timedelta64(1, 'h')).astype(np.int16)
@@ -0,0 +1,201 @@
+"""
+Verificacion de las series del modelo contra observaciones (p. ej. RAMA).
+
+Reemplaza la corrida manual por mes de O3_SWDOWN_mayo_2022.py: los
+pronosticos del almacen (load_forecasts, un renglon por ciclo y plazo) se
+unen con las tablas de observaciones de todas las estaciones por indice
+(estacion, timestamp), y las metricas de cada grupo (estacion, mes, plazo)
+salen de sumas por groupby sobre todos los pares a la vez, sin ciclos en
+Python por grupo:
+
+    n, media del modelo y de la observacion, sesgo (modelo - observacion),
+    RMSE, correlacion de Pearson, regresion lineal obs = slope * modelo +
+    intercept y su valor p
+
+El sesgo y el RMSE solo tienen sentido si el modelo y la observacion son la
+misma cantidad (SWDOWN contra radiacion medida); para O3 contra SWDOWN
+interesan la correlacion y la regresion.
+"""
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from .store import load_forecasts
+
+METRICS = ('n', 'model_mean', 'obs_mean', 'bias', 'rmse', 'r', 'r2', 'slope',
+           'intercept', 'p_value')
+
+
+def long_observations(df, value_name='obs'):
+    """
+    Observaciones en formato largo (station, timestamp, obs).
+
+    Parametros:
+    df (pandas.DataFrame): Tabla larga con columnas 'timestamp', 'station'
+        y `value_name`, o ancha con 'timestamp' y una columna por estacion
+        (como las descargas de RAMA)
+    value_name (str): Columna del valor observado en la tabla larga
+
+    Regresa:
+    pandas.DataFrame: Columnas station (categorica), timestamp y obs
+    (float32), sin valores faltantes
+    """
+    if 'station' in df.columns:
+        obs = df[['station', 'timestamp', value_name]].rename(columns={value_name: 'obs'})
+    else:
+        obs = df.melt(id_vars='timestamp', var_name='station', value_name='obs')
+    obs = obs.assign(
+        station=obs['station'].astype(str).astype('category'),
+        timestamp=pd.to_datetime(obs['timestamp']),
+        obs=pd.to_numeric(obs['obs'], errors='coerce').astype(np.float32),
+    )
+    return obs.dropna(subset=['obs']).reset_index(drop=True)
+
+
+def long_forecasts(forecasts, variable):
+    """
+    Pronosticos de una variable en formato largo.
+
+    Parametros:
+    forecasts (pandas.DataFrame): Resultado de load_forecasts (indice
+        init_time, lead_hour) de una sola region
+    variable (str): Variable del modelo; las series por estacion (selector
+        Stations) tienen columnas <variable>_<estacion>
+
+    Regresa:
+    pandas.DataFrame: Columnas timestamp, init_time, lead_hour, model y,
+    para series por estacion, station. Sin 'station' la serie es de area y
+    se compara contra todas las estaciones
+    """
+    df = forecasts.reset_index()
+    keys = ['timestamp', 'init_time', 'lead_hour']
+    if variable in df.columns:
+        return df[keys + [variable]].rename(columns={variable: 'model'}).dropna(subset=['model'])
+
+    prefix = f"{variable}_"
+    columns = [c for c in df.columns if c.startswith(prefix)]
+    if not columns:
+        raise ValueError(f"No se encontro la variable {variable} en los pronosticos")
+    model = df[keys + columns].melt(id_vars=keys, var_name='station', value_name='model')
+    model['station'] = model['station'].str[len(prefix):].astype('category')
+    return model.dropna(subset=['model'])
+
+
+def pair(model, observations):
+    """
+    Une pronosticos y observaciones por (station, timestamp).
+
+    Cada observacion se repite una vez por ciclo que pronostica su tiempo
+    valido. Los tiempos de ambas tablas deben estar en la misma zona
+    horaria (ver el parametro tz de load_forecasts).
+
+    Parametros:
+    model (pandas.DataFrame): Resultado de long_forecasts
+    observations (pandas.DataFrame): Resultado de long_observations
+
+    Regresa:
+    pandas.DataFrame: Columnas station, timestamp, init_time, lead_hour,
+    model y obs
+    """
+    if 'station' in model.columns:
+        # Mismas categorias en ambos lados para unir por codigo
+        stations = model['station'].cat.categories.union(observations['station'].cat.categories)
+        model = model.assign(station=model['station'].cat.set_categories(stations))
+        obs = observations.assign(station=observations['station'].cat.set_categories(stations))
+        pairs = obs.set_index(['station', 'timestamp']).join(
+            model.set_index(['station', 'timestamp']), how='inner')
+    else:
+        pairs = observations.join(model.set_index('timestamp'), on='timestamp', how='inner')
+    pairs = pairs.reset_index()
+    return pairs[['station', 'timestamp', 'init_time', 'lead_hour', 'model', 'obs']]
+
+
+def verification_metrics(pairs, lead_step=24):
+    """
+    Metricas por (station, month, lead) de todos los pares a la vez.
+
+    Las medias por grupo se calculan primero y las sumas de productos se
+    hacen sobre los valores centrados, para no perder precision con series
+    largas.
+
+    Parametros:
+    pairs (pandas.DataFrame): Resultado de pair
+    lead_step (int): Ancho en horas de los grupos de plazo; 'lead' es la
+        primera hora del grupo (24 = por dia de pronostico: 0, 24, 48, ...)
+
+    Regresa:
+    pandas.DataFrame: Indice (station, month, lead) y columnas METRICS
+    """
+    df = pd.DataFrame({
+        'station': pairs['station'],
+        'month': pairs['timestamp'].to_numpy().astype('datetime64[M]').astype('datetime64[ns]'),
+        'lead': (pairs['lead_hour'].to_numpy() // lead_step * lead_step).astype(np.int16),
+        'x': pairs['model'].to_numpy(dtype=np.float64),
+        'y': pairs['obs'].to_numpy(dtype=np.float64),
+    })
+    keys = ['station', 'month', 'lead']
+    grouped = df.groupby(keys, observed=True, sort=True)
+    means = grouped[['x', 'y']].transform('mean')
+    dx = df['x'] - means['x']
+    dy = df['y'] - means['y']
+    df['n'] = 1
+    df['sxx'] = dx * dx
+    df['syy'] = dy * dy
+    df['sxy'] = dx * dy
+    df['sdd'] = (df['x'] - df['y']) ** 2
+    sums = df.groupby(keys, observed=True, sort=True).sum()
+
+    n = sums['n'].to_numpy(dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        model_mean = sums['x'] / n
+        obs_mean = sums['y'] / n
+        r = sums['sxy'] / np.sqrt(sums['sxx'] * sums['syy'])
+        slope = sums['sxy'] / sums['sxx']
+        t = r * np.sqrt((n - 2) / (1 - r ** 2))
+        p_value = 2 * stats.t.sf(np.abs(t), n - 2)
+
+    metrics = pd.DataFrame({
+        'n': sums['n'].astype(np.int32),
+        'model_mean': model_mean,
+        'obs_mean': obs_mean,
+        'bias': model_mean - obs_mean,
+        'rmse': np.sqrt(sums['sdd'] / n),
+        'r': r,
+        'r2': r ** 2,
+        'slope': slope,
+        'intercept': obs_mean - slope * model_mean,
+        'p_value': np.where(n > 2, p_value, np.nan),
+    }, index=sums.index)
+    return metrics[list(METRICS)]
+
+
+def verify(store_root, observations, variable='SWDOWN', region=None, domain='d02',
+           start=None, end=None, leads=None, tz=None, value_name='obs', lead_step=24):
+    """
+    Verifica los pronosticos del almacen contra una tabla de observaciones.
+
+    Parametros:
+    store_root (str): Almacen Parquet con init_time (ver load_forecasts)
+    observations (pandas.DataFrame): Observaciones (ver long_observations)
+    variable (str): Variable del modelo
+    region (str): Region del almacen (area o estaciones)
+    domain (str): Dominio
+    start, end (str, datetime, optional): Rango de tiempos validos; por
+        omision el de las observaciones
+    leads (tuple, optional): Plazos (min, max) en horas
+    tz (str, optional): Zona horaria de las observaciones (las de RAMA
+        estan en hora local); None = UTC
+    value_name (str): Columna del valor en una tabla larga de observaciones
+    lead_step (int): Ancho de los grupos de plazo (ver verification_metrics)
+
+    Regresa:
+    pandas.DataFrame: Metricas por (station, month, lead)
+    """
+    obs = long_observations(observations, value_name)
+    start = obs['timestamp'].min() if start is None else start
+    end = obs['timestamp'].max() if end is None else end
+    forecasts = load_forecasts(store_root, leads=leads, start=start, end=end, domain=domain,
+                               region=region, columns=None, tz=tz)
+    pairs = pair(long_forecasts(forecasts, variable), obs)
+    print(f"{len(pairs)} pares modelo-observacion de {pairs['station'].nunique()} estaciones")
+    return verification_metrics(pairs, lead_step)